@@ -0,0 +1,109 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул потоков для фоновых задач, создаётся при первом обращении."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_WORKERS,
+                thread_name_prefix='background',
+            )
+        return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась с ошибкой',
+                         func.__name__)
+    finally:
+        connection.close()
+
+
+def submit(func, *args, **kwargs):
+    """
+    Запускает func в фоновом пуле, не блокируя запрос.
+    При BACKGROUND_TASKS_EAGER задача выполняется сразу в текущем потоке.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        return func(*args, **kwargs)
+    return get_executor().submit(_run, func, args, kwargs)
+
+
+class WriteBehindBuffer:
+    """
+    Приращения счётчиков, накопленные в памяти процесса. Функция write
+    получает их пачкой не позже чем через interval секунд после первого
+    приращения: запись идёт в своём потоке-таймере, а не в общем пуле,
+    поэтому буфер простаивающего процесса тоже записывается и не ждёт
+    долгих задач. При остановке процесса теряется не больше интервала.
+    С нулевым интервалом приращения записываются сразу.
+    """
+
+    def __init__(self, write, interval_setting):
+        self.write = write
+        self.interval_setting = interval_setting
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, deltas):
+        interval = getattr(settings, self.interval_setting)
+        timer = None
+        with self.lock:
+            self.pending.update(deltas)
+            if self.timer is None and interval > 0:
+                timer = self.timer = threading.Timer(interval,
+                                                     self._run_timer)
+                timer.daemon = True
+        if interval <= 0:
+            self.flush()
+        elif timer is not None:
+            timer.start()
+
+    def get(self, key):
+        with self.lock:
+            return self.pending[key]
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+
+    def flush(self):
+        """Отдаёт накопленное в write; при ошибке приращения остаются."""
+        with self.lock:
+            deltas, self.pending = self.pending, Counter()
+        if not deltas:
+            return 0
+        try:
+            self.write(deltas)
+        except Exception:
+            with self.lock:
+                self.pending.update(deltas)
+            raise
+        return len(deltas)
+
+    def _run_timer(self):
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Не удалось записать буфер %s',
+                             self.write.__name__)
+        finally:
+            connection.close()
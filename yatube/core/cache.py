@@ -0,0 +1,224 @@
+import hashlib
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.http import Http404
+from django.utils.safestring import mark_safe
+
+from .compression import pack, unpack
+
+
+def invalidation_cache():
+    """Общий для процессов кэш версий: сброс из любого процесса виден всем."""
+    return caches[settings.INVALIDATION_CACHE]
+
+
+def fragment_version(fragment_name):
+    """Текущая версия фрагмента: входит в ключ кэша всех его страниц."""
+    return invalidation_cache().get_or_set(
+        f'fragment_version:{fragment_name}', 1, None)
+
+
+def invalidate_fragment(fragment_name):
+    """Сбрасывает все закэшированные страницы фрагмента разом."""
+    versions = invalidation_cache()
+    key = f'fragment_version:{fragment_name}'
+    versions.add(key, 1, None)
+    versions.incr(key)
+
+
+class _InflightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesce(key, compute_func):
+    """
+    Одновременные вызовы с одинаковым key внутри процесса
+    выполняют compute_func один раз и получают общий результат.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _InflightCall()
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+    try:
+        call.result = compute_func()
+        return call.result
+    except Exception as error:
+        call.error = error
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call.done.set()
+
+
+def _recompute(key, timeout, compute_func):
+    start = time.monotonic()
+    value = pack(compute_func())
+    delta = time.monotonic() - start
+    # Запись живёт дольше timeout, чтобы её можно было отдавать
+    # устаревшей, пока один воркер считает новое значение
+    cache.set(key, (value, time.time() + timeout, delta),
+              timeout + settings.CACHE_STALE_TIMEOUT)
+    return value
+
+
+def get_or_revalidate(key, timeout, compute_func, packed=False):
+    """
+    Кэширование с защитой от лавины пересчётов (stale-while-revalidate).
+    Запись считается устаревшей немного раньше срока со случайным
+    сдвигом, пропорциональным времени вычисления (probabilistic early
+    expiration), поэтому пересчёт не совпадает у всех запросов. Пересчитывает
+    тот, кто взял блокировку в общем кэше, остальные получают старое
+    значение. Пустой кэш заполняется одним вычислением на процесс.
+    Длинные строки хранятся сжатыми; с packed=True они возвращаются
+    как GzipText, чтобы отдать клиенту готовое сжатое тело.
+    """
+    value = _get_or_revalidate(key, timeout, compute_func)
+    return value if packed else unpack(value)
+
+
+def _get_or_revalidate(key, timeout, compute_func):
+    entry = cache.get(key)
+    if entry is None:
+        return coalesce(key, lambda: _recompute(key, timeout, compute_func))
+    value, expires_at, delta = entry
+    early = delta * settings.CACHE_EARLY_EXPIRY_BETA * -math.log(
+        1 - random.random())
+    if time.time() + early < expires_at:
+        return value
+    # Блокировка общая для процессов: пересчитывает один воркер
+    locks = caches[settings.CACHE_LOCK_CACHE]
+    lock_key = f'{key}:lock'
+    if not locks.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        return value
+    try:
+        return coalesce(key, lambda: _recompute(key, timeout, compute_func))
+    finally:
+        locks.delete(lock_key)
+
+
+def cached_result(fragment_name, vary_on, timeout, compute_func,
+                  packed=False):
+    """
+    Возвращает значение из кэша фрагмента fragment_name,
+    при промахе вычисляет его функцией compute_func и сохраняет.
+    """
+    key = make_template_fragment_key(
+        fragment_name, [fragment_version(fragment_name), *vary_on]
+    )
+    return get_or_revalidate(key, timeout, compute_func, packed=packed)
+
+
+def cached_fragment(fragment_name, vary_on, timeout, render_func):
+    """
+    Возвращает общий для всех пользователей HTML-фрагмент из кэша.
+    При промахе фрагмент рендерится функцией render_func и сохраняется.
+    Персональные части страницы (шапка, переключатель лент) в такой
+    фрагмент попадать не должны: они рендерятся отдельно на каждый запрос.
+    """
+    return mark_safe(
+        cached_result(fragment_name, vary_on, timeout, render_func)
+    )
+
+
+# Поля, которые кэшируются для моделей; без записи кэшируются все
+_object_cache_fields = {}
+# Условия, которым должны соответствовать кэшируемые объекты моделей
+_object_cache_filters = {}
+
+
+def object_cache_key(model, field, value):
+    # Значение приходит из адреса: в ключ идёт его хэш, чтобы ключ
+    # подходил любому бэкенду кэша при любых символах и длине
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'object:{model._meta.label_lower}:{field}:{digest}'
+
+
+def get_cached_object_or_404(model, field, value):
+    """
+    get_object_or_404 по уникальному полю через кэш. Отсутствие объекта
+    тоже кэшируется на OBJECT_CACHE_MISS_TIMEOUT в отдельном небольшом
+    кэше OBJECT_CACHE_MISS_CACHE: запросы к несуществующим адресам
+    не доходят до базы и не вытесняют из кэша существующие объекты.
+    Модель должна быть подключена через register_object_cache.
+    """
+    key = object_cache_key(model, field, value)
+    obj = cache.get(key)
+    if obj is not None:
+        return obj
+    misses = caches[settings.OBJECT_CACHE_MISS_CACHE]
+    if misses.get(key):
+        raise Http404
+    queryset = model._default_manager.filter(
+        **_object_cache_filters.get(model, {}))
+    fields = _object_cache_fields.get(model)
+    if fields is not None:
+        queryset = queryset.only(*fields)
+    try:
+        obj = queryset.get(**{field: value})
+    except model.DoesNotExist:
+        misses.set(key, True, settings.OBJECT_CACHE_MISS_TIMEOUT)
+        raise Http404
+    cache.set(key, obj, settings.OBJECT_CACHE_TIMEOUT)
+    return obj
+
+
+def forget_object(model, field, value):
+    key = object_cache_key(model, field, value)
+    cache.delete(key)
+    caches[settings.OBJECT_CACHE_MISS_CACHE].delete(key)
+
+
+def register_object_cache(model, field, fields=None, filters=None):
+    """
+    Сбрасывает кэш объектов model по полю field при их изменении.
+    fields ограничивает кэшируемые поля, например чтобы хэш пароля
+    пользователя не попадал в кэш. Объекты, не подходящие под filters,
+    считаются отсутствующими.
+    """
+    if fields is not None:
+        _object_cache_fields[model] = fields
+    if filters is not None:
+        _object_cache_filters[model] = filters
+
+    def forget_old_value(sender, instance, update_fields=None, **kwargs):
+        if instance.pk is None or (
+                update_fields is not None and field not in update_fields):
+            return
+        old_value = (
+            model._default_manager.filter(pk=instance.pk)
+            .values_list(field, flat=True).first()
+        )
+        if old_value is not None:
+            forget_object(model, field, old_value)
+
+    def forget_value(sender, instance, **kwargs):
+        forget_object(model, field, getattr(instance, field))
+
+    uid = f'object_cache:{model._meta.label_lower}:{field}'
+    pre_save.connect(forget_old_value, sender=model, weak=False,
+                     dispatch_uid=uid)
+    post_save.connect(forget_value, sender=model, weak=False,
+                      dispatch_uid=uid)
+    post_delete.connect(forget_value, sender=model, weak=False,
+                        dispatch_uid=uid)
@@ -0,0 +1,101 @@
+import gzip
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .background import WriteBehindBuffer
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+STATS_KEYS = {
+    'values': 'cache_compression:values',
+    'raw_bytes': 'cache_compression:raw_bytes',
+    'stored_bytes': 'cache_compression:stored_bytes',
+}
+
+
+class GzipText:
+    """
+    Текст, сохранённый в кэше в сжатом gzip виде. Эти же байты
+    отдаются клиенту с Content-Encoding: gzip без повторного сжатия.
+    """
+
+    def __init__(self, text):
+        self.data = gzip.compress(text.encode(),
+                                  settings.CACHE_COMPRESS_LEVEL)
+
+    def __str__(self):
+        return gzip.decompress(self.data).decode()
+
+
+def write_stats(deltas):
+    """Прибавляет накопленную процессом статистику к общим счётчикам."""
+    stats_cache = caches[settings.CACHE_COMPRESSION_STATS_CACHE]
+    for name, value in deltas.items():
+        key = STATS_KEYS[name]
+        stats_cache.add(key, 0, None)
+        try:
+            stats_cache.incr(key, value)
+        except ValueError:
+            pass
+
+
+# Статистика сжатия, ещё не записанная этим процессом в общий кэш
+_stats = WriteBehindBuffer(write_stats, 'CACHE_COMPRESSION_STATS_INTERVAL')
+
+
+def record_stats(raw_bytes, stored_bytes):
+    """
+    Учитывает сжатое значение в памяти процесса. В общий кэш
+    CACHE_COMPRESSION_STATS_CACHE счётчики пишутся не позже
+    CACHE_COMPRESSION_STATS_INTERVAL, чтобы их видела команда
+    cache_compression_stats из другого процесса.
+    """
+    _stats.add({'values': 1, 'raw_bytes': raw_bytes,
+                'stored_bytes': stored_bytes})
+
+
+def flush_stats():
+    return _stats.flush()
+
+
+def compression_stats():
+    """Сколько значений сжато и во сколько раз они уменьшились."""
+    stats_cache = caches[settings.CACHE_COMPRESSION_STATS_CACHE]
+    stats = {
+        name: stats_cache.get(key, 0) for name, key in STATS_KEYS.items()
+    }
+    stats['ratio'] = (
+        stats['raw_bytes'] / stats['stored_bytes']
+        if stats['stored_bytes'] else None
+    )
+    return stats
+
+
+def pack(value):
+    """
+    Сжимает строки длиннее CACHE_COMPRESS_MIN_SIZE, в том числе
+    внутри кортежей, перед записью в кэш.
+    """
+    if isinstance(value, tuple):
+        return tuple(pack(item) for item in value)
+    if not isinstance(value, str) or (
+            len(value) < settings.CACHE_COMPRESS_MIN_SIZE):
+        return value
+    packed = GzipText(value)
+    record_stats(len(value.encode()), len(packed.data))
+    return packed
+
+
+def unpack(value):
+    if isinstance(value, tuple):
+        return tuple(unpack(item) for item in value)
+    if isinstance(value, GzipText):
+        return str(value)
+    return value
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP.search(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')))
@@ -0,0 +1,59 @@
+import logging
+
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import formats
+from django.utils.html import conditional_escape
+from django.utils.timezone import template_localtime
+from jinja2 import Environment
+from markupsafe import Markup
+
+from core.templatetags.responsive_images import render_responsive_image
+
+logger = logging.getLogger(__name__)
+
+
+def url(viewname, *args):
+    """Аналог тега {% url %}."""
+    return reverse(viewname, args=args)
+
+
+def date(value, arg=None):
+    """Аналог фильтра date из шаблонов Django."""
+    if value in (None, ''):
+        return ''
+    return formats.date_format(template_localtime(value), arg)
+
+
+def thumbnail(file_, geometry, **options):
+    """
+    Аналог тега {% thumbnail %} из sorl-thumbnail.
+    Возвращает миниатюру или None, если картинки нет
+    или миниатюру построить не удалось.
+    """
+    if not file_:
+        return None
+    from sorl.thumbnail import get_thumbnail
+
+    try:
+        return get_thumbnail(file_, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру для %s', file_)
+        return None
+
+
+def finalize(value):
+    """Экранирует вывод так же, как это делают шаблоны Django."""
+    return Markup(conditional_escape(value))
+
+
+def environment(**options):
+    env = Environment(finalize=finalize, **options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'thumbnail': thumbnail,
+        'responsive_image': render_responsive_image,
+    })
+    env.filters['date'] = date
+    return env
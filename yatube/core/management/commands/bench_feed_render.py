@@ -0,0 +1,78 @@
+import timeit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+from core.work_constants import LIMIT_POST_COEFFICIENT
+from posts.models import Post
+
+User = get_user_model()
+
+FEED_TEMPLATE = 'posts/includes/post_list.html'
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет стоимость рендера одного поста в цикле ленты '
+        'с обычным и кэширующим загрузчиком шаблонов и в Jinja2.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=LIMIT_POST_COEFFICIENT,
+            help='Количество постов на странице ленты.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Количество рендеров страницы для замера.',
+        )
+
+    def get_page(self, posts_count):
+        author = User(username='bench', first_name='Bench')
+        posts = [
+            Post(id=number, text=f'Пост {number}', author=author,
+                 pub_date=timezone.now())
+            for number in range(1, posts_count + 1)
+        ]
+        return Paginator(posts, posts_count).page(1)
+
+    def get_backend(self, name, loaders):
+        return DjangoTemplates({
+            'NAME': name,
+            'DIRS': settings.TEMPLATES[0]['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {'loaders': loaders},
+        })
+
+    def handle(self, *args, **options):
+        posts_count, repeat = options['posts'], options['repeat']
+        context = {'page_obj': self.get_page(posts_count)}
+        backends = (
+            ('default', self.get_backend('bench_default', BASE_LOADERS)),
+            ('cached', self.get_backend(
+                'bench_cached',
+                [('django.template.loaders.cached.Loader', BASE_LOADERS)],
+            )),
+            ('jinja2', engines['jinja2']),
+        )
+        for label, backend in backends:
+            def render():
+                backend.get_template(FEED_TEMPLATE).render(context)
+
+            render()
+            elapsed = timeit.timeit(render, number=repeat)
+            per_page = elapsed / repeat * 1000
+            per_post = elapsed / (repeat * posts_count) * 1000000
+            self.stdout.write(
+                f'{label:>8}: {per_page:.3f} мс на страницу, '
+                f'{per_post:.1f} мкс на пост'
+            )
@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from users.backends import invalidate_user
+
+User = get_user_model()
+
+CONFIGURATIONS = (
+    ('db', {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': [
+            'django.contrib.auth.backends.ModelBackend',
+        ],
+    }),
+    ('cached', {}),
+)
+
+
+def cache_tables():
+    """Таблицы кэшей в базе: в работе на их месте memcached или Redis."""
+    return [
+        f'"{options["LOCATION"]}"' for options in settings.CACHES.values()
+        if options['BACKEND'].endswith('.db.DatabaseCache')
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает запросы к базе и время ответа авторизованному '
+        'пользователю с сессиями в базе и с сессиями и пользователем в кэше. '
+        'Запросы к таблицам кэша считаются отдельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество запросов к каждой странице для замера времени.',
+        )
+
+    def measure(self, urls, repeat, user):
+        # Адрес не из INTERNAL_IPS, чтобы не подключалась debug-панель
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0],
+                        REMOTE_ADDR='10.0.0.1')
+        client.force_login(user)
+        results = []
+        for url in urls:
+            client.get(url)
+            # Журнал запросов очищается в начале каждого запроса:
+            # перед замером он должен быть пуст, а число запросов
+            # нужно взять до следующего запроса
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            tables = cache_tables()
+            cache_count = sum(
+                any(table in query['sql'] for table in tables)
+                for query in queries
+            )
+            queries_count = len(queries) - cache_count
+            start = time.perf_counter()
+            for _ in range(repeat):
+                client.get(url)
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            results.append((url, queries_count, cache_count, elapsed))
+        return results
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user(username='bench_queries')
+            post = Post.objects.create(author=user, text='Пост для замера')
+            urls = (
+                reverse('posts:index'),
+                reverse('posts:follow_index'),
+                reverse('posts:profile', args=[user.username]),
+                reverse('posts:post_detail', args=[post.id]),
+            )
+            for label, overrides in CONFIGURATIONS:
+                with override_settings(**overrides):
+                    results = self.measure(urls, options['repeat'], user)
+                self.stdout.write(f'{label}:')
+                for url, queries, cache_queries, elapsed in results:
+                    self.stdout.write(
+                        f'{queries:5} запросов {cache_queries:3} к кэшу '
+                        f'{elapsed:8.2f} мс  {url}'
+                    )
+            transaction.set_rollback(True)
+        invalidate_user(user.pk)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from core.compression import compression_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает, насколько сжимаются фрагменты, сохранённые в кэше.'
+
+    def handle(self, *args, **options):
+        stats = compression_stats()
+        if stats['ratio'] is None:
+            self.stdout.write('Сжатых значений пока нет')
+            return
+        self.stdout.write(
+            f'Сжато значений: {stats["values"]}, '
+            f'{filesizeformat(stats["raw_bytes"])} -> '
+            f'{filesizeformat(stats["stored_bytes"])}, '
+            f'коэффициент сжатия {stats["ratio"]:.2f}'
+        )
@@ -0,0 +1,128 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Скрипт запускается в отдельном процессе с -X importtime, чтобы замерить
+# холодный старт: в текущем процессе Django и приложения уже загружены.
+CHILD_SCRIPT = '''
+import json
+import time
+
+from django.apps.config import AppConfig
+
+timings = {}
+original_create = AppConfig.create.__func__
+
+
+def timed(label, func):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[label] = time.perf_counter() - start
+    return wrapper
+
+
+def create(cls, entry):
+    app_config = original_create(cls, entry)
+    app_config.import_models = timed(
+        (app_config.label, 'models'), app_config.import_models)
+    app_config.ready = timed((app_config.label, 'ready'), app_config.ready)
+    return app_config
+
+
+AppConfig.create = classmethod(create)
+
+import django
+
+start = time.perf_counter()
+django.setup()
+total = time.perf_counter() - start
+print(json.dumps({
+    'total': total,
+    'apps': [[label, stage, value]
+             for (label, stage), value in timings.items()],
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Разбирает вывод -X importtime в список (модуль, self, cumulative)."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает время импорта модулей и стоимость загрузки приложений '
+        'при старте Django.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=15,
+            help='Сколько самых медленных модулей и пакетов показать.',
+        )
+
+    def run_child(self):
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        report, stderr = self.run_child()
+        modules = parse_importtime(stderr)
+        packages = defaultdict(int)
+        for name, self_us, _ in modules:
+            packages[name.split('.')[0]] += self_us
+
+        total_import = sum(self_us for _, self_us, _ in modules)
+        self.stdout.write(
+            f'django.setup(): {report["total"] * 1000:.1f} мс, '
+            f'импорт модулей: {total_import / 1000:.1f} мс '
+            f'({len(modules)} модулей)'
+        )
+        self.stdout.write('\nПакеты по собственному времени импорта:')
+        for name, self_us in sorted(packages.items(),
+                                    key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'{self_us / 1000:10.1f} мс  {name}')
+
+        self.stdout.write('\nМодули по собственному времени импорта:')
+        for name, self_us, cumulative_us in sorted(
+                modules, key=lambda item: -item[1])[:limit]:
+            self.stdout.write(
+                f'{self_us / 1000:10.1f} мс  '
+                f'({cumulative_us / 1000:.1f} мс с зависимостями)  {name}'
+            )
+
+        self.stdout.write('\nПриложения (import_models / ready):')
+        apps = defaultdict(dict)
+        for label, stage, value in report['apps']:
+            apps[label][stage] = value
+        for label, stages in apps.items():
+            self.stdout.write(
+                f'{stages.get("models", 0) * 1000:10.1f} мс / '
+                f'{stages.get("ready", 0) * 1000:.1f} мс  {label}'
+            )
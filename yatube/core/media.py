@@ -0,0 +1,109 @@
+import os
+import re
+
+from django.conf import settings
+from django.utils._os import safe_join
+
+# Оригиналы, для которых могут существовать варианты в других форматах
+NEGOTIABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def accepted_types(accept):
+    """Медиа-типы из заголовка Accept, явно разрешённые клиентом."""
+    types = set()
+    for item in accept.split(','):
+        media_type, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            types.add(media_type.strip().lower())
+    return types
+
+
+def negotiate_variant(path, accept):
+    """
+    Подбирает вариант картинки в формате, который принимает клиент.
+    Возвращает (путь, content type) или None, если подходит оригинал.
+    """
+    root, extension = os.path.splitext(path)
+    if extension.lower() not in NEGOTIABLE_EXTENSIONS:
+        return None
+    types = accepted_types(accept)
+    for content_type, variant_extension in settings.MEDIA_NEGOTIATED_FORMATS:
+        variant = f'{root}.{variant_extension}'
+        if content_type in types and os.path.isfile(
+                safe_join(settings.MEDIA_ROOT, variant)):
+            return variant, content_type
+    return None
+
+
+# Проверки доступа к файлам приложений: префикс пути -> check(request, path)
+_access_checks = {}
+
+
+def register_media_access_check(prefix, check):
+    """Файлы с путём, начинающимся с prefix, отдаются, только если check."""
+    _access_checks[prefix] = check
+
+
+def is_media_access_allowed(request, path):
+    """
+    Проверка доступа к файлу до передачи его фронт-серверу:
+    скрытые и недокачанные файлы наружу не отдаются, а для файлов
+    приложений вызывается их зарегистрированная проверка.
+    """
+    parts = path.split('/')
+    if any(part.startswith('.') for part in parts) or path.endswith(
+            '.upload'):
+        return False
+    for prefix, check in _access_checks.items():
+        if path.startswith(prefix):
+            return check(request, path)
+    return True
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+    Возвращает (start, end) включительно, None для отсутствующего
+    или неподдерживаемого заголовка и False для невыполнимого диапазона.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(file_obj, start, end):
+    """Читает из файла байты с start по end включительно кусками."""
+    try:
+        file_obj.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file_obj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file_obj.close()
@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.utils.functional import cached_property
+
+from .cache import invalidation_cache
+
+# Оценка числа строк таблицы по статистике планировщика
+ESTIMATE_QUERIES = {
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+    'mysql': (
+        'SELECT table_rows FROM information_schema.tables '
+        'WHERE table_schema = DATABASE() AND table_name = %s'
+    ),
+    # sqlite_stat1 появляется после ANALYZE; число строк идёт первым
+    # в строке каждого индекса, но у частичных индексов оно меньше
+    'sqlite': (
+        'SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s'
+    ),
+}
+
+
+def count_cache_key(kind):
+    return f'paginator_count:{kind}'
+
+
+def ratio_cache_key(kind):
+    return f'paginator_ratio:{kind}'
+
+
+def invalidate_counts(*kinds):
+    invalidation_cache().delete_many([count_cache_key(kind) for kind in kinds])
+
+
+def estimate_rows(model):
+    """Примерное число строк таблицы модели или None, если оценки нет."""
+    query = ESTIMATE_QUERIES.get(connection.vendor)
+    if query is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(query, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который не считает COUNT(*) на каждый запрос.
+    Число объектов выборки count_key хранится в кэше не дольше
+    PAGINATOR_COUNT_TIMEOUT; маленькие выборки считаются точно,
+    их COUNT дёшев. С estimate=True на больших таблицах берётся оценка
+    из статистики базы; для выборки с условиями она умножается на долю
+    подходящих строк, которая хранится в кэше PAGINATOR_RATIO_TIMEOUT.
+    """
+
+    # Пропуск в номерах страниц, как в Paginator из Django 3.2
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 estimate=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        if self.estimate:
+            count = self.estimated_count()
+            if count is not None:
+                return count
+        if self.count_key is None:
+            return super().count
+        # Число сбрасывается при записи в любом процессе, поэтому
+        # хранится в общем кэше
+        counts = invalidation_cache()
+        key = count_cache_key(self.count_key)
+        count = counts.get(key)
+        if count is None:
+            count = super().count
+            if count >= settings.PAGINATOR_CACHE_MIN_COUNT:
+                counts.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def estimated_count(self):
+        rows = estimate_rows(self.object_list.model)
+        if rows is None or rows < settings.PAGINATOR_ESTIMATE_MIN_ROWS:
+            return None
+        if not self.object_list.query.where:
+            return rows
+        if self.count_key is None:
+            return None
+        # Доля меняется медленно, поэтому точный COUNT(*) нужен редко
+        key = ratio_cache_key(self.count_key)
+        ratio = cache.get(key)
+        if ratio is None:
+            ratio = self.object_list.count() / rows if rows else 0
+            cache.set(key, ratio, settings.PAGINATOR_RATIO_TIMEOUT)
+        return round(rows * ratio)
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """
+        Номера страниц для навигации: первые и последние on_ends страниц
+        и окно вокруг текущей, пропуски заменяются на ELLIPSIS.
+        Длина не зависит от общего числа страниц.
+        """
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
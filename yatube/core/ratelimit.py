@@ -0,0 +1,101 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from .views import too_many_requests
+
+# Токены хранятся в кэше целыми числами: дробная часть скорости
+# пополнения учитывается с точностью до тысячной доли токена
+SCALE = 1000
+
+# Бэкенды с атомарным incr. Кэш в базе не годится: каждый запрос,
+# в том числе отклонённый, писал бы в ту базу, которую лимит защищает
+ATOMIC_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.memcached.MemcachedCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+def bucket_cache():
+    alias = settings.RATE_LIMIT_CACHE
+    if settings.CACHES[alias]['BACKEND'] not in ATOMIC_BACKENDS:
+        raise ImproperlyConfigured(
+            f'RATE_LIMIT_CACHE: кэш {alias!r} не поддерживает атомарный incr'
+        )
+    return caches[alias]
+
+
+def client_ip(request):
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take_token(key, capacity, period):
+    """
+    Забирает токен из корзины: capacity запросов за period секунд.
+    В кэше хранится момент, когда корзина снова станет полной,
+    выраженный в токенах, поэтому запрос обходится одним incr.
+    Возвращает 0, если запрос разрешён, иначе через сколько секунд
+    появится свободный токен.
+    """
+    cache = bucket_cache()
+    rate = capacity / period
+    now = int(time.time() * rate * SCALE)
+    try:
+        full_at = cache.incr(key, SCALE)
+    except ValueError:
+        full_at = None
+    if full_at is None or full_at - SCALE < now:
+        # Ключа нет или корзина успела наполниться: начинаем с полной.
+        # При гонке двух таких запросов один лишний запрос пройдёт
+        cache.set(key, now + SCALE, period + 1)
+        return 0
+    excess = full_at - now - capacity * SCALE
+    if excess > 0:
+        cache.decr(key, SCALE)
+        return excess / (rate * SCALE)
+    # Ключ нужен, пока корзина не наполнится, то есть не дольше period
+    cache.touch(key, period + 1)
+    return 0
+
+
+def rate_limit(methods=None):
+    """
+    Ограничивает частоту запросов к view по алгоритму token bucket
+    отдельно для пользователя и для IP. Лимиты задаются в
+    settings.RATE_LIMITS по имени URL; для остальных URL и методов,
+    не входящих в methods, проверка не выполняется.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            view_name = request.resolver_match.view_name
+            limit = settings.RATE_LIMITS.get(view_name)
+            if limit is None or (methods and request.method not in methods):
+                return view_func(request, *args, **kwargs)
+            buckets = [f'ratelimit:{view_name}:ip:{client_ip(request)}']
+            if request.user.is_authenticated:
+                buckets.append(
+                    f'ratelimit:{view_name}:user:{request.user.pk}')
+            taken = []
+            for key in buckets:
+                retry_after = take_token(key, *limit)
+                if retry_after:
+                    # Токены других корзин возвращаем: запрос не выполнен
+                    for taken_key in taken:
+                        bucket_cache().decr(taken_key, SCALE)
+                    return too_many_requests(request,
+                                             math.ceil(retry_after))
+                taken.append(key)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,169 @@
+import logging
+import threading
+
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from core.background import submit
+
+register = template.Library()
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {'WEBP': 'image/webp'}
+
+
+def source_formats():
+    """Форматы <source>, которые умеют строить Pillow и sorl-thumbnail."""
+    from PIL import Image
+    from sorl.thumbnail.base import EXTENSIONS
+
+    Image.init()
+    return [
+        image_format for image_format in settings.RESPONSIVE_IMAGE_FORMATS
+        if image_format in Image.SAVE and image_format in EXTENSIONS
+        and image_format in MIME_TYPES
+    ]
+
+
+def rendition_widths(max_width):
+    """Ширины миниатюр для srcset, не больше ширины из geometry."""
+    widths = {
+        width for width in settings.RESPONSIVE_IMAGE_WIDTHS
+        if width < max_width
+    }
+    widths.add(max_width)
+    return sorted(widths)
+
+
+def renditions(geometry, options):
+    """
+    Миниатюры тега для geometry: пары (формат или None для формата
+    оригинала, геометрия миниатюры, параметры sorl-thumbnail).
+    """
+    max_width, max_height = (int(side) for side in geometry.split('x'))
+    ratio = max_height / max_width
+    for image_format in (None, *source_formats()):
+        format_options = (
+            options if image_format is None
+            else dict(options, format=image_format)
+        )
+        for width in rendition_widths(max_width):
+            yield image_format, f'{width}x{round(width * ratio)}', \
+                format_options
+
+
+def build_renditions(image, geometry, **options):
+    """
+    Строит все миниатюры тега responsive_image для картинки.
+    Вызывается в фоне: при загрузке картинки или после промаха тега.
+    """
+    from sorl.thumbnail import get_thumbnail
+
+    for _, thumbnail_geometry, thumbnail_options in renditions(
+            geometry, options):
+        get_thumbnail(image, thumbnail_geometry, **thumbnail_options)
+
+
+def cached_thumbnail(image, geometry, options):
+    """
+    Готовая миниатюра из хранилища метаданных sorl-thumbnail или None.
+    Имя миниатюры считается так же, как в ThumbnailBackend.get_thumbnail,
+    но картинка не открывается и ничего не строится.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.conf import defaults as default_settings
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+    from sorl.thumbnail.images import ImageFile
+
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+# Картинки, миниатюры которых уже строятся в фоне этим процессом
+_building = set()
+_building_lock = threading.Lock()
+
+
+def schedule_renditions(image, geometry, options):
+    key = (str(image), geometry, tuple(sorted(options.items())))
+    with _building_lock:
+        if key in _building:
+            return
+        _building.add(key)
+
+    def build():
+        try:
+            build_renditions(image, geometry, **options)
+        finally:
+            with _building_lock:
+                _building.discard(key)
+
+    submit(build)
+
+
+def render_responsive_image(image, geometry, css_class='', sizes=None,
+                            **options):
+    """
+    Рендерит <picture> с srcset из нескольких ширин и отдельным
+    <source> на каждый современный формат. Миниатюры строятся в фоне
+    при загрузке картинки, тег их только читает; если какой-то ещё нет,
+    выводится оригинал, а построение ставится в фоновый пул.
+    """
+    from sorl.thumbnail.images import ImageFile
+
+    if not image:
+        return ''
+    try:
+        max_width = int(geometry.split('x')[0])
+        sizes = sizes or f'(max-width: {max_width}px) 100vw, {max_width}px'
+        srcsets = {}
+        for image_format, thumbnail_geometry, thumbnail_options in (
+                renditions(geometry, options)):
+            thumbnail = cached_thumbnail(image, thumbnail_geometry,
+                                         thumbnail_options)
+            if thumbnail is None:
+                schedule_renditions(image, geometry, options)
+                return format_html('<img class="{}" src="{}">', css_class,
+                                   ImageFile(image).url)
+            srcsets.setdefault(image_format, []).append(thumbnail)
+        thumbnails = srcsets.pop(None)
+        fallback = thumbnails[-1]
+        return format_html(
+            '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" '
+            'width="{}" height="{}"></picture>',
+            format_html_join(
+                '', '<source type="{}" srcset="{}" sizes="{}">',
+                ((MIME_TYPES[image_format], srcset(source_thumbnails), sizes)
+                 for image_format, source_thumbnails in srcsets.items()),
+            ),
+            css_class, fallback.url, srcset(thumbnails), sizes,
+            fallback.width, fallback.height,
+        )
+    except Exception:
+        logger.exception('Не удалось вывести миниатюры для %s', image)
+        return mark_safe('')
+
+
+def srcset(thumbnails):
+    return ', '.join(
+        f'{thumbnail.url} {thumbnail.width}w' for thumbnail in thumbnails
+    )
+
+
+@register.simple_tag
+def responsive_image(image, geometry, css_class='', sizes=None, **options):
+    return render_responsive_image(image, geometry, css_class, sizes,
+                                   **options)
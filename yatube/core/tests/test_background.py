@@ -0,0 +1,38 @@
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from core.background import WriteBehindBuffer
+
+
+class WriteBehindBufferTests(SimpleTestCase):
+    def setUp(self):
+        self.written = []
+        self.done = threading.Event()
+
+    def write(self, deltas):
+        self.written.append(dict(deltas))
+        self.done.set()
+
+    @override_settings(BUFFER_INTERVAL=0.05)
+    def test_idle_buffer_is_flushed_by_timer(self):
+        """Накопленное записывается по таймеру без новых приращений."""
+        buffer = WriteBehindBuffer(self.write, 'BUFFER_INTERVAL')
+        buffer.add({'a': 1})
+        buffer.add({'a': 2, 'b': 1})
+        self.assertEqual(buffer.get('a'), 3)
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.written, [{'a': 3, 'b': 1}])
+        self.assertEqual(buffer.get('a'), 0)
+
+    @override_settings(BUFFER_INTERVAL=3600)
+    def test_failed_write_keeps_deltas(self):
+        def fail(deltas):
+            raise OSError
+
+        buffer = WriteBehindBuffer(fail, 'BUFFER_INTERVAL')
+        buffer.add({'a': 1})
+        with self.assertRaises(OSError):
+            buffer.flush()
+        self.assertEqual(buffer.get('a'), 1)
+        buffer.timer.cancel()
@@ -0,0 +1,101 @@
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import _InflightCall, coalesce, get_or_revalidate
+
+
+# Блокировки другого процесса: отдельный кэш вместо общего в базе
+@override_settings(
+    CACHES={**settings.CACHES, 'locks': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'locks',
+    }},
+    CACHE_LOCK_CACHE='locks',
+)
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def tearDown(self):
+        cache.clear()
+        caches['locks'].clear()
+
+    def fill(self, value, now=1000.0):
+        with mock.patch('core.cache.time.time', return_value=now):
+            get_or_revalidate('key', 20, lambda: value)
+
+    def test_fresh_value_is_served(self):
+        self.fill('old')
+        compute = mock.Mock(return_value='new')
+        with mock.patch('core.cache.time.time', return_value=1010.0):
+            self.assertEqual(get_or_revalidate('key', 20, compute), 'old')
+        compute.assert_not_called()
+
+    def test_expired_value_is_recomputed_once(self):
+        """
+        Просроченное значение пересчитывает тот, кто взял блокировку
+        в общем кэше; блокировка кэша процесса не учитывается.
+        """
+        self.fill('old')
+        locks = caches['locks']
+        with mock.patch('core.cache.time.time', return_value=1030.0):
+            locks.add('key:lock', 1)
+            compute = mock.Mock(return_value='new')
+            self.assertEqual(get_or_revalidate('key', 20, compute), 'old')
+            compute.assert_not_called()
+            locks.delete('key:lock')
+            cache.add('key:lock', 1)
+            self.assertEqual(get_or_revalidate('key', 20, compute), 'new')
+        compute.assert_called_once()
+        self.assertIsNone(locks.get('key:lock'))
+
+    def test_probabilistic_early_expiration(self):
+        """Долгий пересчёт запускается раньше срока."""
+        with mock.patch('core.cache.time.time', return_value=1000.0), \
+                mock.patch('core.cache.time.monotonic',
+                           side_effect=[0.0, 5.0]):
+            get_or_revalidate('key', 20, lambda: 'old')
+        with mock.patch('core.cache.time.time', return_value=1016.0), \
+                mock.patch('core.cache.random.random', return_value=0.9):
+            # 5 с вычисления * -ln(0.1) ≈ 11.5 с раньше срока
+            self.assertEqual(get_or_revalidate('key', 20, lambda: 'new'),
+                             'new')
+
+    def test_inflight_calls_are_coalesced(self):
+        """Одинаковые вычисления в потоках процесса выполняются один раз."""
+        started, waiting, release = (threading.Event(), threading.Event(),
+                                     threading.Event())
+        calls, results = [], []
+
+        class Done(threading.Event):
+            def wait(self, timeout=None):
+                waiting.set()
+                return super().wait(timeout)
+
+        class Call(_InflightCall):
+            def __init__(self):
+                super().__init__()
+                self.done = Done()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        def call():
+            results.append(coalesce('key', compute))
+
+        with mock.patch('core.cache._InflightCall', Call):
+            leader = threading.Thread(target=call)
+            leader.start()
+            started.wait(5)
+            follower = threading.Thread(target=call)
+            follower.start()
+            waiting.wait(5)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['value', 'value'])
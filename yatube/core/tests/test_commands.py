@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core.management.commands.startup_profile import parse_importtime
+
+
+class StartupProfileTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        """Вывод -X importtime разбирается в (модуль, self, cumulative)."""
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   django.utils\n'
+            'import time:       300 |        420 | django\n'
+        )
+        self.assertEqual(parse_importtime(stderr), [
+            ('django.utils', 120, 120),
+            ('django', 300, 420),
+        ])
+
+    def test_startup_profile_reports_apps(self):
+        """Команда показывает время загрузки приложений проекта."""
+        out = StringIO()
+        call_command('startup_profile', limit=3, stdout=out)
+        report = out.getvalue()
+        self.assertIn('django.setup()', report)
+        self.assertIn('posts', report)
+
+    def test_numpy_is_not_imported_at_startup(self):
+        """
+        numpy нужен только для подписей постов и хэшей картинок:
+        ни django.setup(), ни загрузка URL с формами и view его не импортируют.
+        """
+        script = (
+            'import sys, django; django.setup(); '
+            'from django.urls import get_resolver; '
+            'get_resolver().url_patterns; '
+            "print('numpy' in sys.modules)"
+        )
+        env = os.environ.copy()
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.PIPE, universal_newlines=True, check=True,
+        )
+        self.assertEqual(result.stdout.splitlines()[-1], 'False')
+
+
+class BenchRequestQueriesTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_cached_configuration_saves_queries(self):
+        """С сессией и пользователем в кэше запросов к базе меньше."""
+        out = StringIO()
+        call_command('bench_request_queries', repeat=1, stdout=out)
+        db_report, cached_report = out.getvalue().split('cached:')
+        db_counts = [int(line.split()[0])
+                     for line in db_report.splitlines()[1:]]
+        cached_counts = [int(line.split()[0])
+                         for line in cached_report.splitlines()[1:]]
+        for db_count, cached_count in zip(db_counts, cached_counts):
+            with self.subTest(db_count=db_count):
+                self.assertEqual(cached_count, db_count - 2)
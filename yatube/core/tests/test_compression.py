@@ -0,0 +1,53 @@
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.cache import get_or_revalidate
+from core import compression
+from core.compression import GzipText, compression_stats, pack, unpack
+
+
+@override_settings(CACHE_COMPRESS_MIN_SIZE=100)
+class CompressionTests(TestCase):
+    def setUp(self):
+        # Статистика других тестов не должна попасть в проверку
+        compression.flush_stats()
+        caches['shared'].clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_long_strings_are_compressed(self):
+        """Сжимаются только длинные строки, в том числе внутри кортежей."""
+        html = '<article>пост</article>' * 50
+        packed = pack((html, 'cursor', None))
+        self.assertIsInstance(packed[0], GzipText)
+        self.assertEqual(packed[1:], ('cursor', None))
+        self.assertLess(len(packed[0].data), len(html.encode()))
+        self.assertEqual(unpack(packed), (html, 'cursor', None))
+
+    def test_cached_value_is_stored_compressed(self):
+        html = '<article>пост</article>' * 50
+        self.assertEqual(get_or_revalidate('key', 20, lambda: html), html)
+        value, _, _ = cache.get('key')
+        self.assertIsInstance(value, GzipText)
+        self.assertIsInstance(
+            get_or_revalidate('key', 20, lambda: html, packed=True),
+            GzipText)
+
+    @override_settings(CACHE_COMPRESSION_STATS_INTERVAL=3600)
+    def test_compression_stats(self):
+        """Статистика попадает в общий кэш и видна другим процессам."""
+        html = '<article>пост</article>' * 50
+        pack(html)
+        self.assertEqual(compression_stats()['values'], 0)
+        compression.flush_stats()
+        stats = compression_stats()
+        self.assertEqual(stats['values'], 1)
+        self.assertEqual(stats['raw_bytes'], len(html.encode()))
+        self.assertGreater(stats['ratio'], 5)
+        out = StringIO()
+        call_command('cache_compression_stats', stdout=out)
+        self.assertIn('коэффициент сжатия', out.getvalue())
@@ -0,0 +1,200 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from core.templatetags.responsive_images import build_renditions
+
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'ab')
+        os.makedirs(directory)
+        for name, content in (('photo.jpg', b'jpeg'),
+                              ('photo.webp', b'webp'),
+                              ('data.gif', b'0123456789'),
+                              ('.hidden.gif', b'secret')):
+            with open(os.path.join(directory, name), 'wb') as media_file:
+                media_file.write(content)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=name, image=name)
+            for name in ('posts/ab/photo.jpg', 'posts/ab/data.gif')
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get_media(self, accept):
+        response = self.client.get('/media/posts/ab/photo.jpg',
+                                   HTTP_ACCEPT=accept)
+        return response, b''.join(response.streaming_content)
+
+    def test_webp_served_when_accepted(self):
+        """Клиенту, принимающему WebP, отдаётся вариант в WebP."""
+        response, content = self.get_media('image/webp,image/*;q=0.8')
+        self.assertEqual(content, b'webp')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('Accept', response['Vary'])
+
+    def test_original_served_by_default(self):
+        """Без WebP в Accept отдаётся оригинал."""
+        for accept in ('image/*', 'image/webp;q=0, */*'):
+            with self.subTest(accept=accept):
+                response, content = self.get_media(accept)
+                self.assertEqual(content, b'jpeg')
+                self.assertIn('Accept', response['Vary'])
+
+    def test_range_request(self):
+        """Запрос с Range получает 206 и только нужные байты."""
+        cases = (
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+        )
+        for header, expected, content_range in cases:
+            with self.subTest(header=header):
+                response = self.client.get('/media/posts/ab/data.gif',
+                                           HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content),
+                                 expected)
+                self.assertEqual(response['Content-Range'], content_range)
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за пределами файла даёт 416."""
+        response = self.client.get('/media/posts/ab/data.gif',
+                                   HTTP_RANGE='bytes=20-30')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_if_none_match(self):
+        """Совпавший ETag даёт 304 без тела."""
+        response = self.client.get('/media/posts/ab/data.gif')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        response = self.client.get('/media/posts/ab/data.gif',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_hidden_files_not_served(self):
+        """Скрытые файлы и выход за MEDIA_ROOT не отдаются."""
+        response = self.client.get('/media/posts/ab/.hidden.gif')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/media/posts/../../settings.py')
+        self.assertIn(response.status_code, (400, 404))
+
+    def test_images_of_hidden_posts_not_served(self):
+        """
+        Картинки удалённых и неопубликованных постов не отдаются,
+        кроме неопубликованных постов самому автору.
+        """
+        photo, data = self.posts
+        Post.objects.filter(pk=photo.pk).update(is_deleted=True)
+        Post.objects.filter(pk=data.pk).update(is_published=False)
+        for path in ('/media/posts/ab/photo.jpg', '/media/posts/ab/photo.webp',
+                     '/media/posts/ab/data.gif'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get('/media/posts/ab/data.gif')
+                         .status_code, 200)
+        self.assertEqual(self.client.get('/media/posts/ab/photo.jpg')
+                         .status_code, 404)
+
+    def test_accel_redirect(self):
+        """Доставка файла передаётся nginx или серверу с X-Sendfile."""
+        with override_settings(MEDIA_ACCEL_REDIRECT='nginx'):
+            response = self.client.get('/media/posts/ab/photo.jpg',
+                                       HTTP_ACCEPT='image/webp')
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/posts/ab/photo.webp')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_ACCEL_REDIRECT='sendfile'):
+            response = self.client.get('/media/posts/ab/data.gif')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'ab', 'data.gif'),
+        )
+
+    def render_responsive_image(self, name):
+        return Template(
+            '{% load responsive_images %}'
+            '{% responsive_image image "960x480" css_class="card" '
+            'crop="center" %}'
+        ).render(Context({'image': name}))
+
+    def save_big_image(self, name):
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600)).save(buffer, format='JPEG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_responsive_image_renders_srcset(self):
+        """Тег responsive_image выводит srcset из нескольких ширин."""
+        name = self.save_big_image('images/big.jpg')
+        build_renditions(name, '960x480', crop='center')
+        html = self.render_responsive_image(name)
+        self.assertTrue(html.startswith('<picture>'))
+        self.assertIn('class="card"', html)
+        for width in ('320w', '640w', '960w'):
+            with self.subTest(width=width):
+                self.assertIn(width, html)
+
+    def test_responsive_image_does_not_build_thumbnails(self):
+        """
+        Без готовых миниатюр тег выводит оригинал и ставит их построение
+        в фоновый пул, а не строит их в запросе.
+        """
+        name = self.save_big_image('images/cold.jpg')
+        with mock.patch('core.templatetags.responsive_images.submit') as \
+                submit, mock.patch('sorl.thumbnail.get_thumbnail') as \
+                get_thumbnail:
+            html = self.render_responsive_image(name)
+            self.render_responsive_image(name)
+        get_thumbnail.assert_not_called()
+        self.assertEqual(
+            html, f'<img class="card" src="{default_storage.url(name)}">'
+        )
+        submit.assert_called_once()
+        submit.call_args[0][0]()
+        self.assertTrue(
+            self.render_responsive_image(name).startswith('<picture>')
+        )
+
+    def test_responsive_image_without_image(self):
+        """Без картинки тег ничего не выводит."""
+        html = Template(
+            '{% load responsive_images %}'
+            '{% responsive_image image "960x480" %}'
+        ).render(Context({'image': ''}))
+        self.assertEqual(html, '')
+
+    def test_image_access_uses_exact_names(self):
+        """Доступ к картинке проверяется равенством имён, без LIKE."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/media/posts/ab/photo.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries
+                          if 'LIKE' in query['sql']])
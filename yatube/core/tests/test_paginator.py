@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.paginator import CachedCountPaginator, estimate_rows
+from posts.models import Follow, Post, User
+
+
+@override_settings(PAGINATOR_CACHE_MIN_COUNT=0)
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        for number in range(3):
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_count(self, queryset, count_key, **kwargs):
+        return CachedCountPaginator(queryset, 10, count_key=count_key,
+                                    **kwargs).count
+
+    def test_count_is_cached(self):
+        """Повторный подсчёт берётся из общего кэша без COUNT(*)."""
+        self.assertEqual(self.get_count(Post.objects.all(), 'posts'), 3)
+        # Общий кэш в тестах - таблица в базе: остаётся чтение из неё
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_count(Post.objects.all(), 'posts'), 3)
+
+    @override_settings(PAGINATOR_CACHE_MIN_COUNT=10)
+    def test_small_counts_are_exact(self):
+        """Маленькие выборки всегда считаются заново."""
+        self.get_count(Post.objects.all(), 'posts')
+        # Промах общего кэша и COUNT(*)
+        with self.assertNumQueries(2):
+            self.get_count(Post.objects.all(), 'posts')
+
+    def test_counts_are_invalidated(self):
+        """Новый пост и подписка сбрасывают закэшированные числа."""
+        queryset = self.user.posts.all()
+        key = f'author:{self.user.pk}'
+        self.assertEqual(self.get_count(queryset, key), 3)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(self.get_count(queryset, key), 4)
+
+        feed = Post.objects.filter(author__following__user=self.reader)
+        key = f'follow:{self.reader.pk}'
+        self.assertEqual(self.get_count(feed, key), 0)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(self.get_count(feed, key), 4)
+
+    @override_settings(PAGINATOR_ESTIMATE_MIN_ROWS=0)
+    def test_estimate_for_whole_table(self):
+        """Для всей таблицы берётся оценка из статистики базы."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Статистика проверяется на SQLite')
+        self.assertIsNone(estimate_rows(Post))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.create(author=self.user, text='После ANALYZE')
+        self.assertEqual(estimate_rows(Post), 3)
+        self.assertEqual(
+            self.get_count(Post.objects.all(), 'posts', estimate=True), 3)
+
+    def test_estimate_ignores_partial_indexes(self):
+        """Частичный индекс очереди публикации не занижает оценку."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Статистика проверяется на SQLite')
+        Post.objects.create(author=self.user, text='По расписанию',
+                            is_published=False,
+                            publish_at=timezone.now() + timedelta(hours=1))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute(
+                'SELECT COUNT(*) FROM sqlite_stat1 WHERE idx = %s',
+                ['post_publish_queue_idx'])
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(estimate_rows(Post), Post.objects.count())
+
+    @override_settings(PAGINATOR_ESTIMATE_MIN_ROWS=0)
+    def test_estimate_for_filtered_queryset_is_scaled(self):
+        """Оценка выборки с условиями учитывает долю подходящих строк."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Статистика проверяется на SQLite')
+        Post.objects.create(author=self.reader, text='Пост читателя')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        queryset = Post.objects.filter(author=self.reader)
+        self.assertEqual(
+            self.get_count(queryset, 'reader', estimate=True), 1)
+        Post.objects.create(author=self.reader, text='Новый пост')
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.get_count(queryset, 'reader', estimate=True), 1)
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+    def test_elided_page_range(self):
+        """Навигация показывает края и окно вокруг текущей страницы."""
+        paginator = CachedCountPaginator(range(1000), 10)
+        ellipsis = paginator.ELLIPSIS
+        cases = (
+            (1, [1, 2, 3, 4, ellipsis, 99, 100]),
+            (50, [1, 2, ellipsis, 47, 48, 49, 50, 51, 52, 53,
+                  ellipsis, 99, 100]),
+            (100, [1, 2, ellipsis, 97, 98, 99, 100]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected)
+
+    def test_short_range_is_not_elided(self):
+        paginator = CachedCountPaginator(range(50), 10)
+        self.assertEqual(list(paginator.get_elided_page_range(3)),
+                         [1, 2, 3, 4, 5])
@@ -0,0 +1,93 @@
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.ratelimit import take_token
+from posts.models import Post, User
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        # Время близко к настоящему: по нему же кэш считает срок ключей
+        self.now = time.time()
+
+    def tearDown(self):
+        caches['ratelimit'].clear()
+
+    def test_bucket_allows_burst_then_refills(self):
+        """Корзина пропускает capacity запросов и пополняется со временем."""
+        with mock.patch('core.ratelimit.time.time', return_value=self.now):
+            for _ in range(3):
+                self.assertEqual(take_token('bucket', 3, 30), 0)
+            self.assertAlmostEqual(take_token('bucket', 3, 30), 10, places=2)
+        with mock.patch('core.ratelimit.time.time',
+                        return_value=self.now + 10):
+            self.assertEqual(take_token('bucket', 3, 30), 0)
+            self.assertGreater(take_token('bucket', 3, 30), 0)
+
+    def test_idle_bucket_does_not_accumulate(self):
+        """После простоя корзина полна, но не больше capacity."""
+        with mock.patch('core.ratelimit.time.time', return_value=self.now):
+            take_token('bucket', 2, 10)
+        with mock.patch('core.ratelimit.time.time',
+                        return_value=self.now + 4000):
+            self.assertEqual(take_token('bucket', 2, 10), 0)
+            self.assertEqual(take_token('bucket', 2, 10), 0)
+            self.assertGreater(take_token('bucket', 2, 10), 0)
+
+    @override_settings(RATE_LIMIT_CACHE='shared')
+    def test_database_cache_is_rejected(self):
+        """Кэш в базе для корзин не используется."""
+        with self.assertRaises(ImproperlyConfigured):
+            take_token('bucket', 2, 10)
+
+
+@override_settings(RATE_LIMITS={'posts:add_comment': (2, 60),
+                                'posts:post_create': (1, 60)})
+class RateLimitViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        caches['ratelimit'].clear()
+
+    def test_write_endpoint_returns_429(self):
+        """Сверх лимита запись отклоняется с 429 и Retry-After."""
+        url = reverse('posts:add_comment', args=[self.post.id])
+        for _ in range(2):
+            response = self.authorized_client.post(url, {'text': 'Текст'})
+            self.assertEqual(response.status_code, 302)
+        response = self.authorized_client.post(url, {'text': 'Текст'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 30)
+        self.assertEqual(self.post.comments.count(), 2)
+
+    def test_limit_applies_only_to_listed_methods(self):
+        """Открытие формы не расходует токены создания поста."""
+        url = reverse('posts:post_create')
+        for _ in range(3):
+            self.assertEqual(self.authorized_client.get(url).status_code, 200)
+        response = self.authorized_client.post(url, {'text': 'Новый пост'})
+        self.assertEqual(response.status_code, 302)
+        response = self.authorized_client.post(url, {'text': 'Новый пост'})
+        self.assertEqual(response.status_code, 429)
+
+    def test_buckets_are_per_user(self):
+        """Лимит одного пользователя не затрагивает другого с другого IP."""
+        url = reverse('posts:post_create')
+        self.authorized_client.post(url, {'text': 'Новый пост'})
+        other = User.objects.create_user(username='other')
+        other_client = Client(REMOTE_ADDR='10.0.0.2')
+        other_client.force_login(other)
+        response = other_client.post(url, {'text': 'Новый пост'})
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.thumbnail_kvstore import LRUCache
+from posts.media import prefetch_thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        lru = LRUCache(maxsize=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+
+    def test_entries_expire(self):
+        lru = LRUCache(maxsize=2, timeout=60)
+        with mock.patch('core.thumbnail_kvstore.time.monotonic',
+                        return_value=0):
+            lru.set('a', 1)
+        with mock.patch('core.thumbnail_kvstore.time.monotonic',
+                        return_value=61):
+            self.assertIsNone(lru.get('a'))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CachedKVStoreTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        cache.clear()
+        default.kvstore.local.clear()
+
+    def create_thumbnail(self):
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(
+            author=user, text='Пост',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        return post, get_thumbnail(post.image, '20x10')
+
+    def test_prefetch_loads_page_thumbnails(self):
+        """После prefetch миниатюры страницы читаются без запросов к базе."""
+        post, thumbnail = self.create_thumbnail()
+        default.kvstore.local.clear()
+        with self.assertNumQueries(2):
+            prefetch_thumbnails([post])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_thumbnail(post.image, '20x10').url,
+                             thumbnail.url)
+
+    def test_entries_survive_cold_process(self):
+        """Записи лежат в таблице: их видит процесс с пустым LRU и кэшем."""
+        post, thumbnail = self.create_thumbnail()
+        self.assertTrue(KVStoreModel.objects.exists())
+        default.kvstore.local.clear()
+        cache.clear()
+        self.assertIsNotNone(default.kvstore.get(thumbnail))
+        self.assertIsNotNone(default.kvstore.get(ImageFile(post.image)))
+
+    @override_settings(CACHES={
+        **settings.CACHES,
+        'thumbnails': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'thumbnails',
+        },
+    }, THUMBNAIL_CACHE='thumbnails')
+    def test_shared_cache_in_front_of_table(self):
+        """С THUMBNAIL_CACHE записи читаются из кэша без запросов к базе."""
+        post, thumbnail = self.create_thumbnail()
+        default.kvstore.local.clear()
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(default.kvstore.get(thumbnail))
+        default.kvstore.cache.clear()
+
+    def test_cleanup_and_clear(self):
+        """Команды sorl cleanup и clear работают с хранилищем."""
+        post, thumbnail = self.create_thumbnail()
+        storage = post.image.storage
+        stale = ImageFile(storage.save('posts/zz/stale.gif',
+                                       ContentFile(SMALL_GIF + b'\x00')),
+                          storage)
+        default.kvstore.set(stale)
+        storage.delete(stale.name)
+        call_command('thumbnail', 'cleanup', stdout=StringIO())
+        self.assertIsNone(default.kvstore.get(stale))
+        self.assertIsNotNone(default.kvstore.get(thumbnail))
+        call_command('thumbnail', 'clear', stdout=StringIO())
+        self.assertFalse(KVStoreModel.objects.exists())
+        self.assertIsNone(default.kvstore.get(thumbnail))
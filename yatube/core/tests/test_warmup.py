@@ -0,0 +1,16 @@
+from django.template.loader import get_template
+from django.test import TestCase
+
+from core.warmup import iter_template_names, warmup_templates
+
+
+class WarmupTemplatesTests(TestCase):
+    def test_warmup_compiles_all_templates(self):
+        """Прогрев компилирует все шаблоны из каталога templates."""
+        names = list(iter_template_names())
+        self.assertIn('includes/one_post.html', names)
+        self.assertIn('posts/index.html', names)
+        self.assertEqual(warmup_templates(), len(names))
+        for name in names:
+            with self.subTest(name=name):
+                self.assertIsNotNone(get_template(name))
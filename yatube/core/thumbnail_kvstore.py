@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш процесса. Записи живут не дольше timeout,
+    чтобы удаление в другом процессе было видно здесь через короткое время.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class KVStore(KVStoreBase):
+    """
+    Хранилище метаданных sorl-thumbnail. Записи хранятся в таблице
+    thumbnail_kvstore, как у sorl, и видны всем процессам после рестарта;
+    перед таблицей стоит LRU процесса и, если задан THUMBNAIL_CACHE,
+    общий кэш. prefetch загружает метаданные миниатюр всех картинок
+    страницы за два обращения к хранилищу.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.local = LRUCache(settings.THUMBNAIL_LRU_SIZE,
+                              settings.THUMBNAIL_LRU_TIMEOUT)
+
+    @property
+    def cache(self):
+        """Общий кэш перед таблицей или None, если он не настроен."""
+        alias = thumbnail_settings.THUMBNAIL_CACHE
+        if alias is None or alias not in settings.CACHES:
+            return None
+        return caches[alias]
+
+    def prefetch(self, image_files):
+        """Загружает в LRU миниатюры картинок image_files."""
+        thumbnail_lists = self._get_many_raw([
+            add_prefix(image_file.key, 'thumbnails')
+            for image_file in image_files
+        ])
+        thumbnail_keys = set()
+        for value in thumbnail_lists.values():
+            thumbnail_keys.update(deserialize(value))
+        self._get_many_raw([add_prefix(key) for key in thumbnail_keys])
+
+    def _get_many_raw(self, keys):
+        values, missing = {}, []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+        cache = self.cache
+        if missing and cache is not None:
+            found = cache.get_many(missing)
+            values.update(found)
+            missing = [key for key in missing if key not in found]
+        if missing:
+            found = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list('key', 'value')
+            )
+            if found and cache is not None:
+                cache.set_many(found,
+                               thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(found)
+        for key, value in values.items():
+            self.local.set(key, value)
+        return values
+
+    def _get_raw(self, key):
+        return self._get_many_raw([key]).get(key)
+
+    def _set_raw(self, key, value):
+        KVStoreModel.objects.update_or_create(key=key,
+                                              defaults={'value': value})
+        if self.cache is not None:
+            self.cache.set(key, value,
+                           thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        self.local.set(key, value)
+
+    def _delete_raw(self, *keys):
+        KVStoreModel.objects.filter(key__in=keys).delete()
+        if self.cache is not None:
+            self.cache.delete_many(keys)
+        self.local.delete(*keys)
+
+    def _find_keys_raw(self, prefix):
+        return list(
+            KVStoreModel.objects.filter(key__startswith=prefix)
+            .values_list('key', flat=True)
+        )
@@ -1,4 +1,18 @@
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .media import (NEGOTIABLE_EXTENSIONS, is_media_access_allowed,
+                    iter_file_range, negotiate_variant, parse_range)
 
 
 def page_not_found(request, exception):
@@ -13,3 +27,78 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, 'core/429.html',
+                      {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = retry_after
+    return response
+
+
+def serve_media(request, path):
+    """
+    Отдаёт файл из MEDIA_ROOT. После проверки доступа доставка
+    передаётся фронт-серверу через X-Accel-Redirect или X-Sendfile;
+    без фронт-сервера файл отдаётся FileResponse с поддержкой
+    Range и If-None-Match. Варианты WebP/AVIF выбираются по Accept.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if not is_media_access_allowed(request, path):
+        raise Http404
+    variant = negotiate_variant(path, request.META.get('HTTP_ACCEPT', ''))
+    served_path, content_type = variant or (path, None)
+    full_path = safe_join(settings.MEDIA_ROOT, served_path)
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    content_type = (content_type or mimetypes.guess_type(full_path)[0]
+                    or 'application/octet-stream')
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=int(stat.st_mtime))
+    if response is None:
+        response = media_response(request, served_path, full_path,
+                                  stat.st_size, content_type, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if os.path.splitext(path)[1].lower() in NEGOTIABLE_EXTENSIONS:
+        patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def media_response(request, served_path, full_path, size, content_type,
+                   etag):
+    accel = settings.MEDIA_ACCEL_REDIRECT
+    if accel == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(served_path)
+        )
+        return response
+    if accel == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return response
+
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if not if_range or if_range == etag:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        # Целый файл: WSGI-сервер может отдать его через sendfile
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        iter_file_range(open(full_path, 'rb'), start, end),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.template.loader import get_template
+
+
+def iter_template_names(template_dir=None):
+    """Генератор имён всех шаблонов из каталога templates проекта."""
+    template_dir = template_dir or os.path.join(settings.BASE_DIR, 'templates')
+    for root, _, files in os.walk(template_dir):
+        for filename in sorted(files):
+            if filename.endswith('.html'):
+                path = os.path.relpath(os.path.join(root, filename),
+                                       template_dir)
+                yield path.replace(os.sep, '/')
+
+
+def warmup_templates():
+    """
+    Компилирует все шаблоны проекта при старте воркера,
+    чтобы cached loader не разбирал их на первых запросах.
+    Возвращает количество скомпилированных шаблонов.
+    """
+    compiled = 0
+    for name in iter_template_names():
+        get_template(name)
+        compiled += 1
+    return compiled
@@ -1,6 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import Group, Post, Comment, Follow
+from .image_hashes import ban_post_images
+from .models import BannedImage, Group, Post, Comment, Follow, GroupFollow
+from .purge import soft_delete_posts
+from .scheduler import schedule_post
 
 
 @admin.register(Post)
@@ -11,12 +14,41 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'group',
+        'publish_at',
+        'is_published',
+        'is_deleted',
     )
     list_editable = ('group',)
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', 'is_published', 'is_deleted')
+    exclude = ('is_published',)
+    actions = ('ban_images',)
     empty_value_display = '-пусто-'
 
+    def ban_images(self, request, queryset):
+        unhashed = queryset.filter(image_phash=None).exclude(image='').count()
+        hidden = ban_post_images(queryset)
+        self.message_user(request, f'Скрыто постов с копиями: {hidden}')
+        if unhashed:
+            self.message_user(
+                request,
+                f'Пропущено картинок без хэшей: {unhashed}; посчитайте '
+                f'их командой build_image_hashes',
+                messages.WARNING,
+            )
+    ban_images.short_description = 'Запретить картинки и скрыть их копии'
+
+    def save_model(self, request, obj, form, change):
+        if 'publish_at' in form.changed_data:
+            schedule_post(obj, form.cleaned_data['publish_at'])
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        soft_delete_posts(Post.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_posts(queryset)
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -54,3 +86,31 @@ class FollowAdmin(admin.ModelAdmin):
     )
     search_fields = ('user', 'author',)
     empty_value_display = '-пусто-'
+
+
+@admin.register(GroupFollow)
+class GroupFollowAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'group',
+    )
+    search_fields = ('user__username', 'group__slug',)
+    empty_value_display = '-пусто-'
+
+
+@admin.register(BannedImage)
+class BannedImageAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'reason',
+        'pub_date',
+    )
+    readonly_fields = ('ahash', 'dhash', 'phash')
+    search_fields = ('reason',)
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        # Хэши берутся из картинки поста: запреты создаёт действие
+        # «Запретить картинки и скрыть их копии» в списке постов
+        return False
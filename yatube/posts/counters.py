@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models import F
+
+from core.background import WriteBehindBuffer
+from .models import Post
+
+
+def write_views(deltas):
+    """Записывает приращения просмотров одной транзакцией."""
+    with transaction.atomic():
+        for post_id, delta in sorted(deltas.items()):
+            Post.objects.filter(pk=post_id).update(views=F('views') + delta)
+
+
+# Просмотры, ещё не записанные в базу этим процессом
+_views = WriteBehindBuffer(write_views, 'VIEW_COUNTER_FLUSH_INTERVAL')
+
+
+def record_view(post_id):
+    """
+    Учитывает просмотр поста в памяти процесса. В базу просмотры
+    пишутся пачкой не позже VIEW_COUNTER_FLUSH_INTERVAL после первого
+    из них, даже если новых просмотров больше нет.
+    """
+    _views.add({post_id: 1})
+
+
+def pending_views(post_id):
+    """Просмотры поста, накопленные процессом с последней записи в базу."""
+    return _views.get(post_id)
+
+
+def flush_views():
+    """Записывает накопленные просмотры; возвращает число постов."""
+    return _views.flush()
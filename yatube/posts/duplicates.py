@@ -0,0 +1,272 @@
+import re
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import PostBand, PostSignature
+
+# numpy импортируется в функциях: модуль загружается при старте
+# через формы и view, а подписи нужны только при записи постов
+
+# Параметры подписи хранятся в базе вместе с ней: после их смены
+# индекс нужно пересобрать командой build_duplicate_index --rebuild
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SEED = 20221109
+# Сколько шинглов хэшируется за раз: ограничивает память на длинных текстах
+CHUNK_SIZE = 2048
+# Сколько id передаётся в одном IN: у SQLite ограничено число параметров
+ID_BATCH_SIZE = 500
+
+PRIME = 1000003
+_BAND_HASH_MASK = (1 << 56) - 1
+
+
+@lru_cache(maxsize=None)
+def _hash_functions():
+    """Коэффициенты хэш-функций вида (a * x + b) >> 32 для 32-битных x."""
+    import numpy as np
+
+    random = np.random.RandomState(SEED)
+    a = random.randint(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+    a |= np.uint64(1)
+    b = random.randint(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def normalize(text):
+    """Нижний регистр, без знаков препинания и лишних пробелов."""
+    return re.sub(r'[\W_]+', ' ', text.lower()).strip()
+
+
+def shingle_hashes(text):
+    """
+    Хэши уникальных символьных шинглов длины SHINGLE_SIZE.
+    Полиномиальный хэш всех окон считается сразу по массиву
+    кодов символов; переполнение uint64 — взятие по модулю 2**64.
+    """
+    import numpy as np
+
+    codes = np.frombuffer(normalize(text).encode('utf-32-le'),
+                          dtype='<u4').astype(np.uint64)
+    windows = len(codes) - SHINGLE_SIZE + 1
+    if windows < 1:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.zeros(windows, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        hashes = hashes * np.uint64(PRIME) + codes[offset:offset + windows]
+    return np.unique(hashes)
+
+
+def minhash(text):
+    """MinHash-подпись текста: NUM_PERM минимумов по шинглам, uint32."""
+    import numpy as np
+
+    a, b = _hash_functions()
+    hashes = shingle_hashes(text)
+    values = (hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF)
+    signature = np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint64)
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[None, start:start + CHUNK_SIZE]
+        permuted = (a[:, None] * chunk + b[:, None]) >> np.uint64(32)
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def band_keys(signature):
+    """
+    Ключи корзин LSH: номер полосы в старших битах, хэш её ROWS
+    значений — в младших 56. Посты с общей корзиной — кандидаты.
+    """
+    import numpy as np
+
+    rows = signature.reshape(BANDS, ROWS).astype(np.uint64)
+    hashes = np.zeros(BANDS, dtype=np.uint64)
+    for column in range(ROWS):
+        hashes = hashes * np.uint64(PRIME) + rows[:, column]
+    return [
+        (band << 56) | (int(value) & _BAND_HASH_MASK)
+        for band, value in enumerate(hashes)
+    ]
+
+
+def to_bytes(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    import numpy as np
+
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def similarities(signature, signatures):
+    """Оценка сходства Жаккара подписи с каждой строкой матрицы подписей."""
+    return (signatures == signature).mean(axis=1)
+
+
+def find_duplicates(signature, exclude=None):
+    """
+    Почти одинаковые посты: кандидаты из общих корзин LSH одним
+    запросом по индексу, затем проверка оценкой сходства не ниже
+    DUPLICATE_THRESHOLD. Возвращает пары (id поста, сходство).
+    """
+    import numpy as np
+
+    candidates = (
+        PostSignature.objects
+        .filter(post__lsh_bands__key__in=band_keys(signature),
+                post__is_deleted=False)
+        .exclude(post_id=exclude)
+        .distinct()
+        .values_list('post_id', 'minhash')
+    )
+    candidates = list(candidates)
+    if not candidates:
+        return []
+    post_ids = [post_id for post_id, _ in candidates]
+    scores = similarities(
+        signature, np.stack([from_bytes(data) for _, data in candidates])
+    )
+    return sorted(
+        ((post_id, float(score)) for post_id, score in zip(post_ids, scores)
+         if score >= settings.DUPLICATE_THRESHOLD),
+        key=lambda pair: -pair[1],
+    )
+
+
+def is_checked(text):
+    """Короткие тексты не проверяются: у них мало шинглов."""
+    return len(normalize(text)) >= settings.DUPLICATE_MIN_LENGTH
+
+
+def index_post(post, signature=None):
+    """Сохраняет подпись поста и его корзины LSH вместо прежних."""
+    if signature is None:
+        signature = minhash(post.text)
+    with transaction.atomic():
+        PostSignature.objects.update_or_create(
+            post=post, defaults={'minhash': to_bytes(signature)})
+        PostBand.objects.filter(post=post).delete()
+        PostBand.objects.bulk_create(
+            PostBand(post=post, key=key) for key in band_keys(signature)
+        )
+
+
+def update_post_index(post, signature):
+    """После правки текста: переиндексирует пост или убирает из индекса."""
+    if signature is None:
+        PostSignature.objects.filter(post=post).delete()
+        PostBand.objects.filter(post=post).delete()
+    else:
+        index_post(post, signature)
+
+
+def index_posts(posts):
+    """
+    Строит подписи и корзины для пачки постов двумя bulk_create.
+    Короткие тексты в индекс не попадают.
+    """
+    signatures, bands = [], []
+    for post in posts:
+        if not is_checked(post.text):
+            continue
+        signature = minhash(post.text)
+        signatures.append(
+            PostSignature(post=post, minhash=to_bytes(signature)))
+        bands.extend(
+            PostBand(post=post, key=key) for key in band_keys(signature)
+        )
+    with transaction.atomic():
+        PostSignature.objects.bulk_create(signatures)
+        PostBand.objects.bulk_create(bands)
+    return len(signatures)
+
+
+class _Clusters:
+    """Система непересекающихся множеств (union-find) по id постов."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = self.parent.setdefault(item, item)
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        self.parent[self.find(first)] = self.find(second)
+
+    def groups(self):
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return [sorted(group) for group in groups.values()]
+
+
+def shared_buckets():
+    """
+    Корзины LSH, в которых больше одного поста, пачками по ID_BATCH_SIZE
+    корзин. Ключи с повторами находит группировка в базе, а посты
+    читаются только для них, поэтому память не растёт с размером индекса.
+    """
+    bands = PostBand.objects.filter(post__is_deleted=False)
+    keys = (
+        bands.values('key').annotate(posts=Count('id'))
+        .filter(posts__gt=1).order_by('key')
+        .values_list('key', flat=True).iterator()
+    )
+    while True:
+        batch = list(islice(keys, ID_BATCH_SIZE))
+        if not batch:
+            return
+        buckets = {}
+        members = (
+            bands.filter(key__in=batch)
+            .values_list('key', 'post_id').order_by('key', 'post_id')
+        )
+        for key, post_id in members:
+            buckets.setdefault(key, []).append(post_id)
+        yield list(buckets.values())
+
+
+def find_clusters():
+    """
+    Группы почти одинаковых постов по всему индексу: внутри каждой
+    корзины с несколькими постами подписи сравниваются векторно,
+    пары выше порога объединяются.
+    """
+    import numpy as np
+
+    clusters = _Clusters()
+    for buckets in shared_buckets():
+        post_ids = sorted(
+            {post_id for bucket in buckets for post_id in bucket})
+        signatures = {}
+        for start in range(0, len(post_ids), ID_BATCH_SIZE):
+            signatures.update(
+                (post_id, from_bytes(data)) for post_id, data in
+                PostSignature.objects
+                .filter(post_id__in=post_ids[start:start + ID_BATCH_SIZE])
+                .values_list('post_id', 'minhash')
+            )
+        for bucket in buckets:
+            matrix = np.stack([signatures[post_id] for post_id in bucket])
+            for position, post_id in enumerate(bucket[:-1]):
+                scores = similarities(matrix[position],
+                                      matrix[position + 1:])
+                for offset in np.flatnonzero(
+                        scores >= settings.DUPLICATE_THRESHOLD):
+                    clusters.union(post_id, bucket[position + 1 + offset])
+    return sorted(
+        (group for group in clusters.groups() if len(group) > 1),
+        key=lambda group: (-len(group), group[0]),
+    )
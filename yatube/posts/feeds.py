@@ -0,0 +1,149 @@
+import heapq
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.cache import invalidation_cache
+from core.paginator import count_cache_key
+from .models import Follow, GroupFollow, Post
+
+
+def stream_version_key(kind):
+    return f'feed_stream_version:{kind}'
+
+
+def stream_versions(kinds):
+    """
+    Версии потоков лент вида 'author:<id>' и 'group:<id>' одним
+    обращением к кэшу. Потоку без версии присваивается новая.
+    """
+    keys = [stream_version_key(kind) for kind in kinds]
+    versions = invalidation_cache().get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        invalidation_cache().set_many(missing, None)
+        versions.update(missing)
+    return tuple(versions[key] for key in keys)
+
+
+def invalidate_streams(*kinds):
+    """Посты потоков изменились: числа лент с ними нужно пересчитать."""
+    invalidation_cache().delete_many(
+        [stream_version_key(kind) for kind in kinds])
+
+
+def feed_key(post):
+    return post.pub_date, post.pk
+
+
+def posts_after(post_list, after=None):
+    """
+    Посты выборки по убыванию (pub_date, id), начиная сразу после
+    позиции after — пары (pub_date, id) или None для начала ленты.
+    """
+    post_list = post_list.order_by('-pub_date', '-pk')
+    if after is None:
+        return post_list
+    pub_date, pk = after
+    return post_list.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+    )
+
+
+def merge_streams(streams):
+    """
+    Слияние отсортированных по убыванию (pub_date, id) потоков
+    постов через кучу. Пост, попавший в несколько потоков,
+    отдаётся один раз: его копии при слиянии идут подряд.
+    """
+    last_pk = None
+    for post in heapq.merge(*streams, key=feed_key, reverse=True):
+        if post.pk != last_pk:
+            last_pk = post.pk
+            yield post
+
+
+class MergedFeed:
+    """
+    Лента из нескольких выборок постов (например, по автору или группе).
+    Вместо одного запроса с OR по всем подпискам каждая выборка читается
+    по своему индексу и не дальше нужного для страницы числа строк,
+    а результаты сливаются в памяти; если строк нужно слишком много,
+    читается общая выборка combined. Поддерживает срезы и count(),
+    поэтому подходит для Paginator. С count_key число постов хранится
+    в кэше вместе с версиями потоков stream_kinds и пересчитывается,
+    только когда меняется набор потоков или посты в одном из них.
+    """
+
+    def __init__(self, post_lists, combined, count_key=None,
+                 stream_kinds=()):
+        self.post_lists = post_lists
+        # Та же лента одним запросом: нужна только для COUNT
+        self.combined = combined
+        self.count_key = count_key
+        self.stream_kinds = stream_kinds
+
+    def count(self):
+        if self.count_key is None:
+            return self.combined.count()
+        stamp = (self.stream_kinds, stream_versions(self.stream_kinds))
+        cached = cache.get(self.count_key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        count = self.combined.count()
+        cache.set(self.count_key, (stamp, count),
+                  settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def merges(self, limit):
+        """
+        Слияние выгодно, пока на limit постов уходит не больше
+        FEED_MERGE_MAX_ROWS строк всех выборок. На дальних страницах
+        и при большом числе подписок лента читается одним запросом.
+        """
+        return len(self.post_lists) * limit <= settings.FEED_MERGE_MAX_ROWS
+
+    def read(self, limit, after=None):
+        """Первые limit постов ленты после позиции after."""
+        if not self.merges(limit):
+            return list(posts_after(self.combined, after)
+                        .select_related('author', 'group')[:limit])
+        streams = [
+            posts_after(post_list, after).select_related('author', 'group')
+            [:limit]
+            for post_list in self.post_lists
+        ]
+        return list(islice(merge_streams(streams), limit))
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('MergedFeed поддерживает только срезы без шага.')
+        start = key.start or 0
+        if not self.merges(key.stop):
+            return list(posts_after(self.combined)
+                        .select_related('author', 'group')[start:key.stop])
+        return self.read(key.stop)[start:]
+
+
+def followed_feed(user):
+    """Лента подписок: посты авторов и групп, на которые подписан user."""
+    author_ids = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True)
+    group_ids = GroupFollow.objects.filter(user=user).values_list(
+        'group_id', flat=True)
+    visible = Post.objects.visible()
+    stream_kinds, post_lists = [], []
+    for field, kind, ids in (('author_id', 'author', author_ids),
+                             ('group_id', 'group', group_ids)):
+        for pk in ids:
+            stream_kinds.append(f'{kind}:{pk}')
+            post_lists.append(visible.filter(**{field: pk}))
+    combined = visible.filter(
+        Q(author__following__user=user) | Q(group__followers__user=user)
+    ).distinct()
+    return MergedFeed(post_lists, combined,
+                      count_key=count_cache_key(f'follow:{user.pk}'),
+                      stream_kinds=tuple(stream_kinds))
@@ -1,5 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.utils import timezone
 
+from .duplicates import find_duplicates, is_checked, minhash
 from .models import Post, Comment
 
 
@@ -8,6 +11,46 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_text(self):
+        """Отклоняет почти точную копию уже опубликованного поста."""
+        text = self.cleaned_data.get('text')
+        self.signature = None
+        if text and is_checked(text):
+            self.signature = minhash(text)
+            if find_duplicates(self.signature, exclude=self.instance.pk):
+                raise forms.ValidationError(
+                    'Почти такой же пост уже есть на сайте.')
+        return text
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Размеры берутся из заголовка файла, картинка целиком не декодируется
+        header = getattr(image, 'image', None)
+        if header is not None:
+            width, height = header.size
+            if width * height > settings.POST_IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    'Слишком большое изображение: %(width)sx%(height)s.',
+                    params={'width': width, 'height': height},
+                )
+        return image
+
+
+class PublishAtForm(forms.Form):
+    publish_at = forms.DateTimeField(
+        label='Опубликовать в',
+        required=False,
+        help_text='Оставьте пустым, чтобы опубликовать пост сразу',
+        widget=forms.DateTimeInput(attrs={'placeholder': 'ДД.ММ.ГГГГ ЧЧ:ММ'}),
+    )
+
+    def clean_publish_at(self):
+        publish_at = self.cleaned_data.get('publish_at')
+        if publish_at is not None and publish_at <= timezone.now():
+            raise forms.ValidationError(
+                'Время публикации должно быть в будущем.')
+        return publish_at
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,304 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import BannedImage, ImageHashChunk, Post
+from .purge import soft_delete_posts
+
+logger = logging.getLogger(__name__)
+
+HASH_NAMES = ('ahash', 'dhash', 'phash')
+MASK = (1 << 64) - 1
+# pHash делится на CHUNKS частей: при расстоянии не больше r хотя бы
+# одна часть отличается не больше чем на r // CHUNKS бит
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+_DCT_SIZE = 32
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix():
+    # numpy нужен только для расчёта хэшей, при старте он не загружается
+    import numpy as np
+
+    return np.cos(
+        np.pi * np.outer(np.arange(_DCT_SIZE), 2 * np.arange(_DCT_SIZE) + 1)
+        / (2 * _DCT_SIZE)
+    )
+
+
+def _grayscale(image, width, height):
+    import numpy as np
+    from PIL import Image
+
+    small = image.convert('L').resize((width, height), Image.LANCZOS)
+    return np.asarray(small, dtype=np.float64)
+
+
+def _to_int(bits):
+    """64 бита в int64 со знаком, как их хранит BigIntegerField."""
+    import numpy as np
+
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big',
+                          signed=True)
+
+
+def compute_hashes(image):
+    """
+    aHash (яркость выше средней), dHash (градиент по горизонтали)
+    и pHash (низкие частоты DCT выше медианы) картинки Pillow.
+    Все три устойчивы к масштабированию и пересжатию.
+    """
+    import numpy as np
+
+    dct = _dct_matrix()
+    pixels = _grayscale(image, 8, 8)
+    ahash = _to_int(pixels > pixels.mean())
+    pixels = _grayscale(image, 9, 8)
+    dhash = _to_int(pixels[:, 1:] > pixels[:, :-1])
+    pixels = _grayscale(image, _DCT_SIZE, _DCT_SIZE)
+    low = (dct @ pixels @ dct.T)[:8, :8]
+    phash = _to_int(low > np.median(low))
+    return {'ahash': ahash, 'dhash': dhash, 'phash': phash}
+
+
+def hamming(first, second):
+    return bin((first ^ second) & MASK).count('1')
+
+
+def is_copy(first, second):
+    """
+    Копия, если pHash и ещё хотя бы один хэш отличаются не больше чем
+    на IMAGE_HASH_MAX_DISTANCE бит. По pHash кандидаты ищутся в индексе,
+    поэтому без его близости копия не засчитывается.
+    """
+    close = {
+        name for name in HASH_NAMES
+        if hamming(first[name], second[name])
+        <= settings.IMAGE_HASH_MAX_DISTANCE
+    }
+    return 'phash' in close and len(close) >= 2
+
+
+def chunk_keys(value):
+    value &= MASK
+    return [
+        number << CHUNK_BITS | (value >> (CHUNK_BITS * number)) & CHUNK_MASK
+        for number in range(CHUNKS)
+    ]
+
+
+def search_keys(value, radius):
+    """Ключи частей, среди которых есть часть любого хэша в радиусе."""
+    chunk_radius = radius // CHUNKS
+    keys = []
+    for key in chunk_keys(value):
+        keys.append(key)
+        for distance in range(1, chunk_radius + 1):
+            for bits in combinations(range(CHUNK_BITS), distance):
+                flip = 0
+                for bit in bits:
+                    flip |= 1 << bit
+                keys.append(key ^ flip)
+    return keys
+
+
+def similar_posts(hashes, exclude=None):
+    """
+    Посты с копиями картинки: кандидаты по частям pHash одним
+    запросом по индексу, затем проверка всех трёх хэшей.
+    """
+    radius = settings.IMAGE_HASH_MAX_DISTANCE
+    candidates = (
+        Post.objects
+        .filter(image_hash_chunks__key__in=search_keys(hashes['phash'],
+                                                       radius))
+        .exclude(pk=exclude)
+        .distinct()
+        .values_list('pk', 'image_ahash', 'image_dhash', 'image_phash')
+    )
+    return [
+        pk for pk, *values in candidates
+        if is_copy(hashes, dict(zip(HASH_NAMES, values)))
+    ]
+
+
+class BKTree:
+    """
+    Дерево Буркхарда — Келлера по расстоянию Хэмминга: при поиске
+    в радиусе обходятся только ветви, расстояние которых отличается
+    от расстояния до узла не больше чем на радиус.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        node = (value, item, {})
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, radius):
+        """Элементы, значение которых не дальше radius от value."""
+        if self.root is None:
+            return []
+        found, stack = [], [self.root]
+        while stack:
+            node_value, item, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.append(item)
+            stack.extend(
+                child for child_distance, child in children.items()
+                if distance - radius <= child_distance <= distance + radius
+            )
+        return found
+
+
+# Дерево запрещённых картинок процесса: отметка списка в базе, время
+# её проверки и само дерево
+_blocklist = None
+_blocklist_lock = threading.Lock()
+
+
+def invalidate_blocklist():
+    """Перепроверить список при следующем обращении в этом процессе."""
+    global _blocklist
+    with _blocklist_lock:
+        _blocklist = None
+
+
+def blocklist_stamp():
+    stamp = BannedImage.objects.aggregate(Max('pk'), Count('pk'))
+    return stamp['pk__max'], stamp['pk__count']
+
+
+def get_blocklist():
+    """
+    BK-дерево по pHash запрещённых картинок. Дерево живёт в процессе;
+    не чаще раза в IMAGE_BLOCKLIST_CHECK_INTERVAL секунд его отметка
+    сверяется с базой, так что запрет из другого процесса тоже виден.
+    """
+    global _blocklist
+    with _blocklist_lock:
+        now = time.monotonic()
+        if _blocklist is not None and (
+                now - _blocklist[1] < settings.IMAGE_BLOCKLIST_CHECK_INTERVAL):
+            return _blocklist[2]
+        stamp = blocklist_stamp()
+        if _blocklist is not None and _blocklist[0] == stamp:
+            tree = _blocklist[2]
+        else:
+            tree = BKTree()
+            for pk, *values in BannedImage.objects.values_list(
+                    'pk', *HASH_NAMES):
+                hashes = dict(zip(HASH_NAMES, values))
+                tree.add(hashes['phash'], (pk, hashes))
+        _blocklist = (stamp, now, tree)
+        return tree
+
+
+def find_banned(hashes):
+    """id запрещённой картинки, копией которой являются hashes, или None."""
+    matches = get_blocklist().search(hashes['phash'],
+                                     settings.IMAGE_HASH_MAX_DISTANCE)
+    for pk, banned in matches:
+        if is_copy(hashes, banned):
+            return pk
+    return None
+
+
+def save_hashes(post_id, name, hashes):
+    """
+    Записывает хэши и части pHash поста, если картинка за это время
+    не сменилась. Возвращает False, если сменилась.
+    """
+    with transaction.atomic():
+        updated = Post.objects.filter(pk=post_id, image=name).update(
+            **{f'image_{hash_name}': value
+               for hash_name, value in hashes.items()}
+        )
+        if not updated:
+            return False
+        ImageHashChunk.objects.filter(post_id=post_id).delete()
+        ImageHashChunk.objects.bulk_create(
+            ImageHashChunk(post_id=post_id, key=key)
+            for key in chunk_keys(hashes['phash'])
+        )
+    return True
+
+
+def forget_hashes(post_id):
+    """Картинку у поста убрали: её хэши больше не нужны."""
+    with transaction.atomic():
+        Post.objects.filter(pk=post_id).update(
+            image_ahash=None, image_dhash=None, image_phash=None)
+        ImageHashChunk.objects.filter(post_id=post_id).delete()
+
+
+def check_post_image(post_id):
+    """
+    Фоновая задача: считает хэши картинки поста, сохраняет их
+    и скрывает пост, если картинка — копия запрещённой.
+    """
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    check_image(post_id, post.image.name)
+
+
+def check_image(post_id, name):
+    """
+    Считает и сохраняет хэши картинки name поста post_id. Возвращает
+    id запрещённой картинки, если пост скрыт как её копия, иначе None.
+    """
+    from PIL import Image, ImageOps
+
+    with Post.image.field.storage.open(name) as image_file:
+        image = ImageOps.exif_transpose(Image.open(image_file))
+        hashes = compute_hashes(image)
+    if not save_hashes(post_id, name, hashes):
+        return None
+    banned = find_banned(hashes)
+    if banned is not None:
+        soft_delete_posts(Post.objects.filter(pk=post_id))
+        logger.warning('Пост %s скрыт: картинка совпала с запрещённой %s',
+                       post_id, banned)
+    return banned
+
+
+def ban_post_images(posts):
+    """
+    Запрещает картинки постов и скрывает эти посты вместе
+    со всеми постами, где есть их копии. Картинки без хэшей
+    (загруженные до их подсчёта) учитываются после build_image_hashes.
+    """
+    hidden = set()
+    posts = posts.exclude(image_phash=None).values_list(
+        'pk', *(f'image_{name}' for name in HASH_NAMES))
+    for pk, *values in posts:
+        hashes = dict(zip(HASH_NAMES, values))
+        BannedImage.objects.create(reason=f'Картинка поста {pk}', **hashes)
+        hidden.add(pk)
+        hidden.update(similar_posts(hashes))
+    soft_delete_posts(Post.objects.filter(pk__in=hidden))
+    return len(hidden)
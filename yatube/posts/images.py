@@ -0,0 +1,116 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from core.background import submit
+from core.templatetags.responsive_images import build_renditions
+from .image_hashes import check_post_image, forget_hashes
+from .media import VARIANT_EXTENSIONS, is_managed_image
+from .models import Post
+
+# Форматы, которые приводим к нормальному виду; GIF и прочие не трогаем
+NORMALIZED_FORMATS = ('JPEG', 'PNG', 'WEBP', 'MPO')
+
+
+def variant_formats():
+    """Форматы вариантов, которые умеет сохранять установленный Pillow."""
+    from PIL import Image
+
+    Image.init()
+    return [
+        image_format for image_format in settings.POST_IMAGE_VARIANT_FORMATS
+        if image_format in Image.SAVE and image_format in VARIANT_EXTENSIONS
+    ]
+
+
+def encode(image, image_format, **options):
+    buffer = BytesIO()
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    # Пустой exif не даёт Pillow перенести метаданные из исходника
+    image.save(buffer, format=image_format, exif=b'',
+               quality=settings.POST_IMAGE_QUALITY, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def normalize_post_image(post_id):
+    """
+    Уменьшает слишком большую картинку поста, удаляет из неё EXIF
+    и сохраняет рядом варианты в современных форматах.
+    """
+    from PIL import Image, ImageOps
+
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not is_managed_image(post.image.name):
+        return
+    name = post.image.name
+    storage = Post.image.field.storage
+    with storage.open(name) as image_file:
+        image = Image.open(image_file)
+        image_format = 'JPEG' if image.format == 'MPO' else image.format
+        if (image_format not in NORMALIZED_FORMATS
+                or getattr(image, 'is_animated', False)):
+            return
+        has_metadata = bool(image.info.get('exif'))
+        image = ImageOps.exif_transpose(image)
+        max_side = settings.POST_IMAGE_MAX_SIDE
+        needs_resize = max(image.size) > max_side
+        if needs_resize:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        icc_profile = image.info.get('icc_profile')
+        options = {'icc_profile': icc_profile} if icc_profile else {}
+
+        if needs_resize or has_metadata:
+            new_name = storage.save(name, encode(image, image_format,
+                                                 **options))
+            # Прежний файл удалит gc_media, если он больше никому не нужен
+            updated = Post.objects.filter(pk=post_id, image=name).update(
+                image=new_name
+            )
+            if not updated:
+                return
+            name = new_name
+
+        for variant_format in variant_formats():
+            if variant_format == image_format:
+                continue
+            storage.save_variant(
+                name, VARIANT_EXTENSIONS[variant_format],
+                encode(image, variant_format, **options),
+            )
+
+
+def build_post_renditions(post_id):
+    """Строит миниатюры, которые выводят шаблоны постов."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    for geometry, options in settings.POST_IMAGE_RENDITIONS:
+        build_renditions(post.image, geometry, **options)
+
+
+def process_post_image(post_id):
+    """
+    Обработка картинки, её проверка по списку запрещённых и построение
+    миниатюр. Проверка выполняется, даже если обработка не удалась.
+    """
+    try:
+        normalize_post_image(post_id)
+    finally:
+        check_post_image(post_id)
+    build_post_renditions(post_id)
+
+
+def schedule_image_processing(post):
+    """
+    Ставит обработку картинки поста в фоновый пул после коммита.
+    Если картинку убрали, забывает её хэши.
+    """
+    if post.image:
+        transaction.on_commit(
+            lambda: submit(process_post_image, post.pk)
+        )
+    elif post.image_phash is not None:
+        forget_hashes(post.pk)
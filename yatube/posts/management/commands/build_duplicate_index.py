@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from posts.duplicates import find_clusters, index_posts
+from posts.models import Post, PostBand, PostSignature
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит MinHash-подписи и корзины LSH для постов без подписи '
+        'и показывает группы почти одинаковых постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Удалить индекс и построить его заново.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов индексировать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько самых больших групп показать.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            PostBand.objects.all().delete()
+            PostSignature.objects.all().delete()
+        posts = (
+            Post.objects.filter(signature__isnull=True)
+            .only('pk', 'text').order_by('pk')
+        )
+        indexed, last_pk = 0, 0
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            indexed += index_posts(batch)
+            last_pk = batch[-1].pk
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
+
+        clusters = find_clusters()
+        self.stdout.write(
+            f'Групп почти одинаковых постов: {len(clusters)}, '
+            f'постов в них: {sum(len(group) for group in clusters)}'
+        )
+        for group in clusters[:options['limit']]:
+            ids = ', '.join(str(post_id) for post_id in group)
+            self.stdout.write(f'{len(group):6}  {ids}')
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from posts.image_hashes import check_image
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает перцептивные хэши картинок постов, загруженных до их '
+        'подсчёта, строит части pHash для поиска копий и скрывает копии '
+        'запрещённых картинок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов читать из базы за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        posts = (
+            Post.objects.filter(image_phash__isnull=True)
+            .exclude(image='').order_by('pk')
+        )
+        hashed = hidden = failed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk)
+                .values_list('pk', 'image')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            for pk, name in batch:
+                try:
+                    banned = check_image(pk, name)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'Пост {pk}, {name}: {error}')
+                    continue
+                hashed += 1
+                hidden += banned is not None
+            last_pk = batch[-1][0]
+        self.stdout.write(
+            f'Посчитаны хэши картинок постов: {hashed}, '
+            f'скрыто копий запрещённых: {hidden}, ошибок: {failed}'
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts.media_gc import collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не ссылается ни один пост, '
+        'и осиротевшие миниатюры. С --limit обходит часть каталогов и '
+        'продолжает с того же места при следующем запуске.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Сколько каталогов обойти за запуск.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=None,
+            help='Не трогать файлы моложе заданного числа секунд.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не удаляя.',
+        )
+
+    def handle(self, *args, **options):
+        deleted, reclaimed = collect_garbage(
+            limit=options['limit'],
+            min_age=options['min_age'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Можно удалить' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} файлов: {deleted}, '
+            f'освобождено: {filesizeformat(reclaimed)} ({reclaimed} байт)'
+        )
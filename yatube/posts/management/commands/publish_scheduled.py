@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.scheduler import PublishScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        'Публикует посты по расписанию. Процесс спит до времени '
+        'ближайшего назначенного поста; с --once публикует наступившие '
+        'и завершается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Опубликовать наступившие посты и выйти (для cron).',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = PublishScheduler()
+        if options['once']:
+            published = scheduler.run_once()
+            self.stdout.write(f'Опубликовано постов: {published}')
+            return
+        self.stdout.write('Планировщик публикаций запущен.')
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            self.stdout.write('Планировщик публикаций остановлен.')
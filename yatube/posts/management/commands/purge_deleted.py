@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.purge import purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        'Пачками удаляет мягко удалённых пользователей и посты '
+        'вместе с зависимыми объектами и картинками. Веб-процессы '
+        'только скрывают их, удаление выполняет эта команда.'
+    )
+
+    def handle(self, *args, **options):
+        users = purge_deleted()
+        self.stdout.write(f'Очищено пользователей: {users}')
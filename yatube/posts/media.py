@@ -0,0 +1,56 @@
+import os
+from functools import lru_cache
+
+from django.core.validators import get_available_image_extensions
+
+from .models import Post
+
+# Расширения вариантов картинки, сохраняемых рядом с оригиналом
+VARIANT_EXTENSIONS = {'WEBP': 'webp', 'AVIF': 'avif'}
+
+
+def is_managed_image(name):
+    """Картинка лежит в каталоге, которым управляет поле Post.image."""
+    return bool(name) and name.startswith(Post.image.field.upload_to)
+
+
+@lru_cache(maxsize=None)
+def original_extensions():
+    """Расширения, с которыми ImageField принимает картинку поста."""
+    return tuple(sorted(set(get_available_image_extensions())))
+
+
+def original_names(path):
+    """Имена картинок постов, которыми или вариантом которых будет path."""
+    stem, extension = os.path.splitext(path)
+    if extension[1:] not in VARIANT_EXTENSIONS.values():
+        return [path]
+    return [path, *(f'{stem}.{original}'
+                    for original in original_extensions()
+                    if original != extension[1:])]
+
+
+def can_view_image(request, path):
+    """
+    Картинка и её варианты отдаются, пока на неё ссылается пост,
+    который видит пользователь: у мягко удалённых постов и постов
+    с запрещёнными картинками файл доступен только до gc_media.
+    Имена сравниваются на равенство, чтобы поиск шёл по индексу image.
+    """
+    return Post.objects.visible_to(request.user).filter(
+        image__in=original_names(path)
+    ).exists()
+
+
+def prefetch_thumbnails(posts):
+    """
+    Одним пакетом загружает метаданные миниатюр картинок постов,
+    если хранилище sorl-thumbnail это умеет.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.images import ImageFile
+
+    prefetch = getattr(default.kvstore, 'prefetch', None)
+    if prefetch is None:
+        return
+    prefetch([ImageFile(post.image) for post in posts if post.image])
@@ -0,0 +1,218 @@
+import logging
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .media import VARIANT_EXTENSIONS
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Место, где остановился прошлый запуск с limit; скрытые файлы
+# в MEDIA_ROOT наружу не отдаются
+CURSOR_FILE = '.gc_media_cursor'
+# Сколько миниатюр проверяется одним запросом к таблице sorl-thumbnail
+THUMBNAIL_BATCH_SIZE = 500
+# Хранилища метаданных, которые держат все записи в таблице thumbnail_kvstore
+TABLE_KVSTORES = (
+    'core.thumbnail_kvstore.KVStore',
+    'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore',
+)
+
+
+def list_shards():
+    """
+    Каталоги, которые обходит сборщик: каталог картинок постов,
+    его подкаталоги по первым символам хэша и первый уровень каталога
+    миниатюр sorl-thumbnail. Каждый каталог обрабатывается отдельно,
+    поэтому память ограничена размером одного каталога.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+
+    shards = []
+    for storage, prefix, kind in (
+        (Post.image.field.storage, Post.image.field.upload_to, 'images'),
+        (default.storage, thumbnail_settings.THUMBNAIL_PREFIX, 'thumbnails'),
+    ):
+        if not storage.exists(prefix):
+            continue
+        directories, _ = storage.listdir(prefix)
+        shards.append((kind, prefix, False))
+        shards.extend(
+            (kind, f'{prefix}{directory}/', True)
+            for directory in sorted(directories)
+        )
+    return shards
+
+
+def iter_old_files(storage, prefix, recursive, min_age):
+    """Файлы каталога старше min_age секунд: (имя, размер)."""
+    deadline = time.time() - min_age
+    root = storage.path(prefix)
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if not recursive:
+            dirnames.clear()
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > deadline:
+                continue
+            name = os.path.relpath(path, storage.location)
+            yield name.replace(os.sep, '/'), stat.st_size
+
+
+def name_range(prefix):
+    """
+    Условия на имена картинок, начинающиеся с prefix: диапазон
+    [prefix, следующая строка) ищется по индексу image, а не перебором.
+    """
+    return {'image__gte': prefix,
+            'image__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+
+def collect_images(prefix, recursive, min_age, dry_run):
+    """
+    Удаляет картинки каталога, на которые не ссылается ни один пост,
+    вместе с их вариантами WebP/AVIF и миниатюрами. Для подкаталога
+    имена постов берутся одним диапазоном по индексу; в корневом
+    каталоге лежат только старые картинки, и каждая проверяется своим
+    диапазоном, чтобы не читать имена из всех подкаталогов.
+    """
+    from sorl.thumbnail import delete
+    from sorl.thumbnail.images import ImageFile
+
+    storage = Post.image.field.storage
+    if recursive:
+        referenced = {
+            os.path.splitext(name)[0]
+            for name in Post.objects.filter(**name_range(prefix))
+            .values_list('image', flat=True).iterator()
+        }
+
+        def is_referenced(stem):
+            return stem in referenced
+    else:
+        def is_referenced(stem):
+            return Post.objects.filter(**name_range(f'{stem}.')).exists()
+
+    variant_extensions = {f'.{ext}' for ext in VARIANT_EXTENSIONS.values()}
+    deleted = reclaimed = 0
+    for name, size in iter_old_files(storage, prefix, recursive, min_age):
+        stem, extension = os.path.splitext(name)
+        if is_referenced(stem):
+            continue
+        if not dry_run:
+            if extension in variant_extensions or extension == '.upload':
+                storage.delete(name)
+            else:
+                delete(ImageFile(name, storage))
+        deleted += 1
+        reclaimed += size
+    return deleted, reclaimed
+
+
+def collect_thumbnails(prefix, recursive, min_age, dry_run):
+    """
+    Удаляет файлы миниатюр, для которых нет записи в таблице метаданных
+    sorl-thumbnail: их исходная картинка удалена или запись потеряна.
+    Решение принимается по базе, а не по кэшам процесса, поэтому
+    отдельный процесс команды не считает живые миниатюры сиротами.
+    Нужная миниатюра будет построена заново при следующем показе.
+    """
+    from sorl.thumbnail import default
+    from sorl.thumbnail.images import ImageFile
+    from sorl.thumbnail.kvstores.base import add_prefix
+    from sorl.thumbnail.models import KVStore as KVStoreModel
+
+    storage = default.storage
+    deleted = reclaimed = 0
+    files = iter_old_files(storage, prefix, recursive, min_age)
+    while True:
+        batch = {
+            add_prefix(ImageFile(name, storage).key): (name, size)
+            for name, size in islice(files, THUMBNAIL_BATCH_SIZE)
+        }
+        if not batch:
+            return deleted, reclaimed
+        known = set(
+            KVStoreModel.objects.filter(key__in=list(batch))
+            .values_list('key', flat=True)
+        )
+        for key, (name, size) in batch.items():
+            if key in known:
+                continue
+            if not dry_run:
+                storage.delete(name)
+            deleted += 1
+            reclaimed += size
+
+
+def check_thumbnail_kvstore():
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+
+    if thumbnail_settings.THUMBNAIL_KVSTORE not in TABLE_KVSTORES:
+        raise ImproperlyConfigured(
+            'gc_media проверяет миниатюры по таблице thumbnail_kvstore, '
+            f'а THUMBNAIL_KVSTORE = {thumbnail_settings.THUMBNAIL_KVSTORE}'
+        )
+
+
+def cursor_path():
+    return os.path.join(settings.MEDIA_ROOT, CURSOR_FILE)
+
+
+def read_cursor():
+    try:
+        with open(cursor_path(), encoding='utf-8') as cursor_file:
+            return cursor_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_cursor(prefix):
+    """Записывает курсор атомарно: прерванный запуск не портит файл."""
+    path = cursor_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as cursor_file:
+        cursor_file.write(prefix or '')
+    os.replace(tmp_path, path)
+
+
+def collect_garbage(limit=None, min_age=None, dry_run=False):
+    """
+    Обходит до limit каталогов, продолжая с места прошлого запуска,
+    и возвращает число удалённых файлов и освобождённых байт.
+    Без limit обходятся все каталоги.
+    """
+    check_thumbnail_kvstore()
+    if min_age is None:
+        min_age = settings.GC_MEDIA_MIN_AGE
+    shards = list_shards()
+    if limit is not None:
+        prefixes = [prefix for _, prefix, _ in shards]
+        cursor = read_cursor()
+        start = prefixes.index(cursor) + 1 if cursor in prefixes else 0
+        if start >= len(shards):
+            start = 0
+        shards = shards[start:start + limit]
+    deleted = reclaimed = 0
+    for kind, prefix, recursive in shards:
+        collect = collect_images if kind == 'images' else collect_thumbnails
+        shard_deleted, shard_reclaimed = collect(prefix, recursive,
+                                                 min_age, dry_run)
+        deleted += shard_deleted
+        reclaimed += shard_reclaimed
+        logger.info('%s: удалено файлов %s, освобождено %s байт',
+                    prefix, shard_deleted, shard_reclaimed)
+    if limit is not None and not dry_run:
+        write_cursor(shards[-1][1] if shards else None)
+    return deleted, reclaimed
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_image_content_hash_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_deleted',
+            field=models.BooleanField(db_index=True, default=False, help_text='Пост скрыт и ожидает фоновой очистки', verbose_name='Удалён'),
+        ),
+    ]
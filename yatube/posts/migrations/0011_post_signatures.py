@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_publish_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSignature',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('minhash', models.BinaryField(verbose_name='MinHash-подпись')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True, verbose_name='Номер и хэш полосы')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_bands', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BannedImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации')),
+                ('ahash', models.BigIntegerField(verbose_name='aHash')),
+                ('dhash', models.BigIntegerField(verbose_name='dHash')),
+                ('phash', models.BigIntegerField(verbose_name='pHash')),
+                ('reason', models.CharField(blank=True, max_length=200, verbose_name='Причина')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_ahash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='aHash картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_dhash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='dHash картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_phash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='pHash картинки'),
+        ),
+        migrations.CreateModel(
+            name='ImageHashChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.IntegerField(db_index=True, verbose_name='Номер и значение части')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_hash_chunks', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 
 from core.models import CreatedModel
 from core.work_constants import TITLE_LIMITATION
+from users.models import PendingDeletion
+from .storage import ContentHashStorage
 
 User = get_user_model()
 
@@ -25,6 +27,35 @@ class Group(models.Model):
         return self.title
 
 
+def deleted_user_ids():
+    """
+    Подзапрос id удалённых пользователей: условие на него не требует
+    соединения с таблицей пользователей.
+    """
+    return PendingDeletion.objects.values('user_id')
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """
+        Опубликованные посты, не удалённые сами
+        и не принадлежащие удалённым авторам.
+        """
+        return self.filter(is_published=True, is_deleted=False).exclude(
+            author_id__in=deleted_user_ids())
+
+    def visible_to(self, user):
+        """Видимые посты и ещё не опубликованные посты самого user."""
+        if not user.is_authenticated:
+            return self.visible()
+        return self.filter(
+            models.Q(is_published=True)
+            & ~models.Q(author_id__in=deleted_user_ids())
+            | models.Q(author=user),
+            is_deleted=False,
+        )
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -48,11 +79,58 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentHashStorage(),
+        blank=True,
+        db_index=True,
+    )
+    is_deleted = models.BooleanField(
+        'Удалён',
+        default=False,
+        db_index=True,
+        help_text='Пост скрыт и ожидает фоновой очистки',
+    )
+    # Перцептивные хэши картинки (64 бита со знаком) для поиска её копий
+    image_ahash = models.BigIntegerField(
+        'aHash картинки', blank=True, null=True, editable=False)
+    image_dhash = models.BigIntegerField(
+        'dHash картинки', blank=True, null=True, editable=False)
+    image_phash = models.BigIntegerField(
+        'pHash картинки', blank=True, null=True, editable=False)
+    publish_at = models.DateTimeField(
+        'Опубликовать в',
+        blank=True,
+        null=True,
+        help_text='Пост появится в лентах в указанное время',
+    )
+    is_published = models.BooleanField(
+        'Опубликован',
+        default=True,
+        db_index=True,
+    )
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False,
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            # Лента по убыванию даты и курсор бесконечной прокрутки
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_id_idx'),
+            # Потоки ленты подписок по автору и по группе
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_id_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_id_idx'),
+            # Очередь планировщика: в индексе только ждущие публикации посты
+            models.Index(fields=('publish_at', 'id'),
+                         name='post_publish_queue_idx',
+                         condition=models.Q(is_published=False)),
+        )
 
     def __str__(self):
         return self.text[:TITLE_LIMITATION]
@@ -75,7 +153,7 @@ class Comment(CreatedModel):
         verbose_name='Текст комментария',
         help_text='Введите текст комментария',
     )
-    
+
     class Meta:
         ordering = ('-pub_date',)
 
@@ -96,3 +174,117 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор на которого подписываются',
     )
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='Подписчик',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Группа, на которую подписываются',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'group'),
+                                    name='unique_user_group_follow'),
+        )
+
+
+class Reaction(CreatedModel):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+        verbose_name='Пост',
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_user_post_reaction'),
+        )
+
+    def __str__(self):
+        return f'{self.user} → {self.post_id}'
+
+
+class ReactionCounter(models.Model):
+    """
+    Часть счётчика реакций поста. Приращения расходятся по случайным
+    строкам, поэтому частые лайки одного поста не ждут блокировку
+    одной строки; число реакций — сумма всех частей.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reaction_counters',
+        verbose_name='Пост',
+    )
+    shard = models.PositiveSmallIntegerField('Номер части')
+    count = models.IntegerField('Приращение', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('post', 'shard'),
+                                    name='unique_post_reaction_shard'),
+        )
+
+
+class PostSignature(models.Model):
+    """MinHash-подпись текста поста для поиска почти одинаковых постов."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Пост',
+    )
+    minhash = models.BinaryField('MinHash-подпись')
+
+
+class PostBand(models.Model):
+    """Корзина LSH: посты с совпадающей полосой подписи."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='lsh_bands',
+        verbose_name='Пост',
+    )
+    key = models.BigIntegerField('Номер и хэш полосы', db_index=True)
+
+
+class ImageHashChunk(models.Model):
+    """
+    Часть pHash картинки поста для поиска по расстоянию Хэмминга
+    (multi-index hashing): номер части в старших битах ключа.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_hash_chunks',
+        verbose_name='Пост',
+    )
+    key = models.IntegerField('Номер и значение части', db_index=True)
+
+
+class BannedImage(CreatedModel):
+    ahash = models.BigIntegerField('aHash')
+    dhash = models.BigIntegerField('dHash')
+    phash = models.BigIntegerField('pHash')
+    reason = models.CharField('Причина', max_length=200, blank=True)
+
+    def __str__(self):
+        return self.reason or f'Запрещённая картинка {self.pk}'
@@ -0,0 +1,124 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from core.cache import forget_object, invalidate_fragment
+from users.backends import invalidate_users
+from users.models import PendingDeletion
+from .models import (Comment, Follow, GroupFollow, ImageHashChunk, Post,
+                     PostBand, PostSignature, Reaction, ReactionCounter,
+                     User)
+from .reactions import forget_user_reactions
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_batches(queryset):
+    """
+    Удаляет объекты небольшими пачками в отдельных транзакциях
+    с паузой между ними, чтобы не держать блокировку базы надолго.
+    """
+    deleted = 0
+    model = queryset.model
+    while True:
+        ids = list(
+            queryset.order_by().values_list('pk', flat=True)
+            [:settings.PURGE_BATCH_SIZE]
+        )
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        time.sleep(settings.PURGE_BATCH_PAUSE)
+
+
+def purge_posts(posts):
+    """
+    Удаляет посты вместе с комментариями и реакциями.
+    Картинки, оставшиеся без постов, потом удалит gc_media.
+    """
+    deleted = delete_in_batches(Comment.objects.filter(post__in=posts))
+    delete_in_batches(Reaction.objects.filter(post__in=posts))
+    delete_in_batches(ReactionCounter.objects.filter(post__in=posts))
+    delete_in_batches(PostBand.objects.filter(post__in=posts))
+    delete_in_batches(PostSignature.objects.filter(post__in=posts))
+    delete_in_batches(ImageHashChunk.objects.filter(post__in=posts))
+    return deleted + delete_in_batches(posts)
+
+
+def purge_user(user_id):
+    """Пачками удаляет всё, что связано с пользователем, затем его самого."""
+    purge_posts(Post.objects.filter(author_id=user_id))
+    delete_in_batches(Comment.objects.filter(author_id=user_id))
+    forget_user_reactions(user_id)
+    delete_in_batches(Follow.objects.filter(user_id=user_id))
+    delete_in_batches(Follow.objects.filter(author_id=user_id))
+    delete_in_batches(GroupFollow.objects.filter(user_id=user_id))
+    User.objects.filter(pk=user_id).delete()
+    logger.info('Пользователь %s удалён', user_id)
+
+
+def purge_deleted():
+    """Дочищает всё, что было мягко удалено, например после рестарта."""
+    user_ids = list(
+        PendingDeletion.objects.values_list('user_id', flat=True)
+    )
+    for user_id in user_ids:
+        purge_user(user_id)
+    purge_posts(Post.objects.filter(is_deleted=True))
+    return len(user_ids)
+
+
+def invalidate_feeds(posts, author_ids=()):
+    """
+    Сбрасывает кэш лент, в которые попадают посты posts,
+    и лент авторов author_ids.
+    """
+    fragment_names = {'index_page',
+                      *(f'author_feed:{pk}' for pk in author_ids)}
+    for author_id, group_id in posts.values_list('author_id', 'group_id'):
+        fragment_names.add(f'author_feed:{author_id}')
+        if group_id:
+            fragment_names.add(f'group_feed:{group_id}')
+    for fragment_name in fragment_names:
+        invalidate_fragment(fragment_name)
+
+
+def soft_delete_users(users):
+    """
+    Сразу скрывает пользователей и их контент: признаком удаления
+    служит запись PendingDeletion. Вход им закрывается через is_active.
+    Сами объекты удаляет команда purge_deleted.
+    """
+    user_ids, usernames = [], []
+    for user_id, username in users.values_list('pk', 'username'):
+        user_ids.append(user_id)
+        usernames.append(username)
+
+    def forget_users():
+        # update() не шлёт сигналов: кэш пользователей сбрасываем вручную
+        for username in usernames:
+            forget_object(User, 'username', username)
+        invalidate_users(user_ids)
+        invalidate_feeds(Post.objects.filter(author_id__in=user_ids),
+                         user_ids)
+
+    with transaction.atomic():
+        User.objects.filter(pk__in=user_ids).update(is_active=False)
+        for user_id in user_ids:
+            PendingDeletion.objects.get_or_create(user_id=user_id)
+        transaction.on_commit(forget_users)
+    return len(user_ids)
+
+
+def soft_delete_posts(posts):
+    """Сразу скрывает посты; удаляет их команда purge_deleted."""
+    post_ids = list(posts.values_list('pk', flat=True))
+    with transaction.atomic():
+        Post.objects.filter(pk__in=post_ids).update(is_deleted=True)
+        transaction.on_commit(lambda: invalidate_feeds(
+            Post.objects.filter(pk__in=post_ids)))
+    return len(post_ids)
@@ -0,0 +1,119 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Reaction, ReactionCounter
+
+
+def reaction_count_key(post_id):
+    return f'reactions:{post_id}'
+
+
+def _incr_cached_count(post_id, delta):
+    try:
+        cache.incr(reaction_count_key(post_id), delta)
+    except ValueError:
+        # Числа нет в кэше: его посчитают при следующем чтении
+        pass
+
+
+def add_reactions(post_id, delta):
+    """
+    Прибавляет delta к счётчику реакций поста в случайной части
+    из REACTION_COUNTER_SHARDS, число в кэше правится после коммита.
+    """
+    shard = random.randrange(settings.REACTION_COUNTER_SHARDS)
+    counters = ReactionCounter.objects.filter(post_id=post_id, shard=shard)
+    if not counters.update(count=F('count') + delta):
+        try:
+            with transaction.atomic():
+                ReactionCounter.objects.create(
+                    post_id=post_id, shard=shard, count=delta)
+        except IntegrityError:
+            # Часть успел создать параллельный запрос
+            counters.update(count=F('count') + delta)
+    transaction.on_commit(lambda: _incr_cached_count(post_id, delta))
+
+
+def toggle_reaction(user, post):
+    """Ставит реакцию пользователя на пост или снимает её; True — стоит."""
+    with transaction.atomic():
+        deleted, _ = Reaction.objects.filter(user=user, post=post).delete()
+        if deleted:
+            add_reactions(post.pk, -1)
+            return False
+        try:
+            with transaction.atomic():
+                Reaction.objects.create(user=user, post=post)
+        except IntegrityError:
+            return True
+        add_reactions(post.pk, 1)
+        return True
+
+
+def forget_user_reactions(user_id):
+    """Снимает все реакции пользователя и вычитает их из счётчиков."""
+    per_post = (
+        Reaction.objects.filter(user_id=user_id).order_by()
+        .values_list('post_id').annotate(total=Count('pk'))
+    )
+    for post_id, total in per_post:
+        with transaction.atomic():
+            deleted, _ = Reaction.objects.filter(
+                user_id=user_id, post_id=post_id).delete()
+            if deleted:
+                add_reactions(post_id, -deleted)
+    return len(per_post)
+
+
+def reaction_counts(post_ids):
+    """
+    Число реакций для каждого поста: сначала из кэша одним get_many,
+    недостающие — одним запросом суммы частей счётчиков.
+    """
+    keys = {post_id: reaction_count_key(post_id) for post_id in post_ids}
+    cached = cache.get_many(keys.values())
+    counts = {
+        post_id: cached[key] for post_id, key in keys.items() if key in cached
+    }
+    missing = [post_id for post_id in keys if post_id not in counts]
+    if missing:
+        totals = dict(
+            ReactionCounter.objects.filter(post_id__in=missing).order_by()
+            .values_list('post_id').annotate(total=Sum('count'))
+        )
+        fresh = {post_id: totals.get(post_id, 0) for post_id in missing}
+        cache.set_many(
+            {keys[post_id]: total for post_id, total in fresh.items()},
+            settings.REACTION_COUNT_TIMEOUT,
+        )
+        counts.update(fresh)
+    return counts
+
+
+def liked_post_ids(user, post_ids):
+    """Посты из post_ids, на которые пользователь поставил реакцию."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(
+        Reaction.objects.filter(user=user, post_id__in=post_ids)
+        .values_list('post_id', flat=True)
+    )
+
+
+def attach_reactions(posts, user=None):
+    """
+    Проставляет постам страницы reaction_count, а если передан
+    пользователь — ещё и liked. Без пользователя результат можно
+    класть в общий для всех кэш.
+    """
+    posts = list(posts)
+    post_ids = [post.pk for post in posts]
+    counts = reaction_counts(post_ids)
+    liked = liked_post_ids(user, post_ids) if user is not None else set()
+    for post in posts:
+        post.reaction_count = counts[post.pk]
+        post.liked = post.pk in liked
@@ -0,0 +1,111 @@
+import heapq
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import invalidate_fragment
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_post(post, publish_at):
+    """Назначает посту время публикации; без времени пост виден сразу."""
+    post.publish_at = publish_at
+    post.is_published = publish_at is None
+
+
+def publish_queue():
+    """Ждущие публикации посты по времени; читается по частичному индексу."""
+    return Post.objects.filter(
+        is_published=False, publish_at__isnull=False
+    ).order_by('publish_at', 'pk')
+
+
+def publish_posts(post_ids):
+    """
+    Публикует посты: дата публикации становится назначенной,
+    сбрасываются счётчики и кэш лент, в которые они попадают.
+    """
+    published = []
+    with transaction.atomic():
+        posts = Post.objects.select_for_update().filter(
+            pk__in=post_ids, is_published=False)
+        for post in posts:
+            post.pub_date = post.publish_at
+            post.is_published = True
+            # Сигнал post_save сбрасывает счётчики постов в лентах
+            post.save(update_fields=('pub_date', 'is_published'))
+            published.append(post)
+    if published:
+        invalidate_fragment('index_page')
+    for fragment_name in {
+        *(f'author_feed:{post.author_id}' for post in published),
+        *(f'group_feed:{post.group_id}' for post in published
+          if post.group_id),
+    }:
+        invalidate_fragment(fragment_name)
+    return len(published)
+
+
+class PublishScheduler:
+    """
+    Очередь с приоритетом по времени публикации. В кучу загружаются
+    ближайшие SCHEDULER_BATCH_SIZE постов из индекса, планировщик спит
+    до срока первого из них и публикует все наступившие. Посты
+    назначаются в веб-процессах, поэтому новые из них, срок которых
+    раньше загруженных, подхватываются при следующей загрузке очереди,
+    не позже чем через SCHEDULER_MAX_SLEEP.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.stopped = threading.Event()
+
+    def load(self):
+        self.queue = [
+            (publish_at, pk) for pk, publish_at in
+            publish_queue().values_list('pk', 'publish_at')
+            [:settings.SCHEDULER_BATCH_SIZE]
+        ]
+        heapq.heapify(self.queue)
+
+    def publish_due(self, now=None):
+        """Публикует посты из очереди, срок которых наступил."""
+        now = now or timezone.now()
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            due.append(heapq.heappop(self.queue)[1])
+        return publish_posts(due) if due else 0
+
+    def seconds_to_next(self, now=None):
+        if not self.queue:
+            return settings.SCHEDULER_MAX_SLEEP
+        now = now or timezone.now()
+        delay = (self.queue[0][0] - now).total_seconds()
+        return min(max(delay, 0), settings.SCHEDULER_MAX_SLEEP)
+
+    def run_once(self):
+        """Публикует всё, что уже наступило, и возвращает число постов."""
+        total = 0
+        while True:
+            self.load()
+            loaded = len(self.queue)
+            total += self.publish_due()
+            # Пачка разошлась целиком: за ней могут быть ещё наступившие
+            if self.queue or loaded < settings.SCHEDULER_BATCH_SIZE:
+                return total
+
+    def run(self):
+        while not self.stopped.is_set():
+            published = self.run_once()
+            if published:
+                logger.info('Опубликовано постов по расписанию: %s',
+                            published)
+            self.stopped.wait(self.seconds_to_next())
+
+    def stop(self):
+        self.stopped.set()
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import register_object_cache
+from core.media import register_media_access_check
+from core.paginator import invalidate_counts
+from .feeds import invalidate_streams
+from .image_hashes import invalidate_blocklist
+from .media import can_view_image
+from .models import BannedImage, Follow, Group, GroupFollow, Post
+
+register_object_cache(Group, 'slug')
+register_media_access_check(Post.image.field.upload_to, can_view_image)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_post_counts(sender, instance, **kwargs):
+    invalidate_counts('posts', f'group:{instance.group_id}',
+                      f'author:{instance.author_id}')
+    invalidate_streams(f'author:{instance.author_id}',
+                       f'group:{instance.group_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=GroupFollow)
+@receiver(post_delete, sender=GroupFollow)
+def forget_follow_count(sender, instance, **kwargs):
+    invalidate_counts(f'follow:{instance.user_id}')
+
+
+@receiver(post_save, sender=BannedImage)
+@receiver(post_delete, sender=BannedImage)
+def forget_blocklist(sender, **kwargs):
+    transaction.on_commit(invalidate_blocklist)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище, раскладывающее файлы по хэшу содержимого.
+    Одинаковые картинки хранятся на диске в одном экземпляре,
+    поэтому и миниатюры sorl-thumbnail для них строятся один раз.
+    Файлы без ссылок удаляет gc_media, а не удаление поста: новый пост
+    может переиспользовать файл до того, как его строка попадёт в базу.
+    Переиспользованный файл получает свежее время изменения, чтобы
+    сборщик не счёл его старым.
+    Файлы создаются с O_EXCL без цикла подбора имени из FileSystemStorage:
+    если файл с тем же именем уже есть, в нём то же содержимое.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым в _save, одинаковые файлы совпадают
+        return name
+
+    def hashed_name(self, name, content_hash):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, content_hash[:2],
+                            f'{content_hash}{extension}')
+
+    def variant_name(self, name, extension):
+        """Имя варианта картинки в другом формате, лежащего рядом с ней."""
+        return f'{os.path.splitext(name)[0]}.{extension}'
+
+    def save_variant(self, name, extension, content):
+        """Сохраняет вариант картинки под именем, производным от исходного."""
+        variant = self.variant_name(name, extension)
+        # Тот же вариант могла записать параллельная задача: он совпадает
+        self.create(variant, content)
+        return variant
+
+    def _save(self, name, content):
+        content_hash = getattr(content, 'content_hash', None)
+        if content_hash is None:
+            return self._save_streaming(name, content)
+        name = self.hashed_name(name, content_hash)
+        if not self.touch(name) and not self.create(name, content):
+            self.touch(name)
+        return name.replace('\\', '/')
+
+    def create(self, name, content):
+        """
+        Записывает новый файл; False, если такой файл уже сохранил
+        параллельный запрос или фоновая задача.
+        """
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            fd = os.open(full_path, self.OS_OPEN_FLAGS, 0o666)
+        except FileExistsError:
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as new_file:
+                for chunk in content.chunks():
+                    new_file.write(chunk)
+        except BaseException:
+            os.remove(full_path)
+            raise
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return True
+
+    def touch(self, name):
+        """Обновляет время изменения файла; False, если файла нет."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _save_streaming(self, name, content):
+        """
+        Сохраняет файл, хэш которого не посчитан при загрузке:
+        файл читается один раз, одновременно в хэш и во временный файл.
+        """
+        directory = self.path(os.path.dirname(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+            name = self.hashed_name(name, digest.hexdigest())
+            full_path = self.path(name)
+            if self.touch(name):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name.replace('\\', '/')
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Post, User
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        counters._views.clear()
+        self.guest_client = Client()
+        self.url = reverse('posts:post_detail', args=[self.post.id])
+
+    def tearDown(self):
+        counters._views.clear()
+        cache.clear()
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=3600)
+    def test_views_are_buffered(self):
+        """Просмотр не пишет в базу, но сразу виден на странице."""
+        for _ in range(3):
+            response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Просмотров:  3')
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views, 0)
+
+        self.assertEqual(counters.flush_views(), 1)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views, 3)
+        self.assertEqual(counters.pending_views(self.post.id), 0)
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Просмотров:  4')
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=0,
+                       BACKGROUND_TASKS_EAGER=True)
+    def test_flush_is_scheduled_by_interval(self):
+        """По истечении интервала приращения записываются пачкой."""
+        self.guest_client.get(self.url)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views, 1)
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.duplicates import (NUM_PERM, band_keys, find_duplicates,
+                              index_post, minhash, normalize, shared_buckets,
+                              similarities)
+from posts.models import Post, PostBand, PostSignature, User
+
+SPAM = (
+    'Лучшие кредиты без проверок и справок! Переходите по ссылке '
+    'и получите деньги уже сегодня, одобрение за пять минут.'
+)
+SPAM_VARIANT = (
+    'ЛУЧШИЕ кредиты без проверок и справок!!! Переходите по ссылке, '
+    'и получите деньги уже сегодня — одобрение за 5 минут.'
+)
+OTHER = (
+    'Сегодня гуляли по набережной, смотрели на закат и обсуждали, '
+    'куда поехать летом всей семьёй.'
+)
+
+
+class MinHashTests(SimpleTestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize('  Привет,   МИР!_ '), 'привет мир')
+
+    def test_signature_is_stable(self):
+        signature = minhash(SPAM)
+        self.assertEqual(signature.shape, (NUM_PERM,))
+        self.assertTrue((signature == minhash(SPAM.upper())).all())
+
+    def test_similarity_estimate(self):
+        """Похожие тексты близки по подписи, разные — далеки."""
+        signature = minhash(SPAM)
+        variant, other = similarities(
+            signature, [minhash(SPAM_VARIANT), minhash(OTHER)])
+        self.assertGreater(variant, 0.8)
+        self.assertLess(other, 0.2)
+        self.assertTrue(
+            set(band_keys(signature)) & set(band_keys(minhash(SPAM_VARIANT)))
+        )
+
+
+class DuplicateDetectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.spammer = User.objects.create_user(username='spammer')
+
+    def setUp(self):
+        self.spammer_client = Client()
+        self.spammer_client.force_login(self.spammer)
+
+    def tearDown(self):
+        cache.clear()
+        caches['ratelimit'].clear()
+
+    def test_create_rejects_near_duplicate(self):
+        self.spammer_client.post(reverse('posts:post_create'),
+                                 {'text': SPAM})
+        post = Post.objects.get()
+        self.assertEqual(PostSignature.objects.get().post, post)
+        self.assertEqual(PostBand.objects.filter(post=post).count(), 16)
+
+        response = self.spammer_client.post(reverse('posts:post_create'),
+                                            {'text': SPAM_VARIANT})
+        self.assertFormError(response, 'form', 'text',
+                             'Почти такой же пост уже есть на сайте.')
+        self.assertEqual(Post.objects.count(), 1)
+
+        self.spammer_client.post(reverse('posts:post_create'),
+                                 {'text': OTHER})
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_short_texts_are_not_checked(self):
+        for _ in range(2):
+            self.spammer_client.post(reverse('posts:post_create'),
+                                     {'text': 'Всем привет!'})
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertFalse(PostSignature.objects.exists())
+
+    def test_edit_keeps_own_post(self):
+        """Правка поста не считает дубликатом сам этот пост."""
+        post = Post.objects.create(author=self.spammer, text=SPAM)
+        index_post(post)
+        self.spammer_client.post(
+            reverse('posts:post_edit', args=[post.id]),
+            {'text': SPAM_VARIANT},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, SPAM_VARIANT)
+        self.assertEqual(find_duplicates(minhash(SPAM_VARIANT)),
+                         [(post.id, 1.0)])
+
+    def test_build_index_reports_clusters(self):
+        posts = [
+            Post.objects.create(author=author, text=text)
+            for author, text in (
+                (self.spammer, SPAM),
+                (self.spammer, SPAM_VARIANT),
+                (self.user, OTHER),
+                (self.user, 'Короткий пост'),
+            )
+        ]
+        out = StringIO()
+        call_command('build_duplicate_index', stdout=out)
+        report = out.getvalue()
+        self.assertIn('Проиндексировано постов: 3', report)
+        self.assertIn('Групп почти одинаковых постов: 1, постов в них: 2',
+                      report)
+        self.assertIn(f'{posts[0].pk}, {posts[1].pk}', report)
+
+        out = StringIO()
+        call_command('build_duplicate_index', stdout=out)
+        self.assertIn('Проиндексировано постов: 0', out.getvalue())
+
+    def test_shared_buckets_skip_single_post_keys(self):
+        """Читаются только корзины, в которых больше одного поста."""
+        spam, variant, other = (
+            Post.objects.create(author=self.user, text=text)
+            for text in (SPAM, SPAM_VARIANT, OTHER)
+        )
+        for post in (spam, variant, other):
+            index_post(post)
+        buckets = [bucket for batch in shared_buckets() for bucket in batch]
+        self.assertTrue(buckets)
+        for bucket in buckets:
+            with self.subTest(bucket=bucket):
+                self.assertEqual(bucket, [spam.pk, variant.pk])
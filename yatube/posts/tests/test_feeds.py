@@ -0,0 +1,133 @@
+from django.core.cache import cache, caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.work_constants import LIMIT_POST_COEFFICIENT
+from posts.feeds import followed_feed, merge_streams
+from posts.models import Follow, Group, GroupFollow, Post, User
+
+
+class FollowedFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        # Посты автора в группе попадают в оба потока ленты
+        cls.posts = [
+            Post.objects.create(
+                author=(cls.author, cls.stranger)[number % 2],
+                group=cls.group if number % 3 else None,
+                text=f'Пост номер {number}.',
+            )
+            for number in range(LIMIT_POST_COEFFICIENT * 2)
+        ]
+        cls.unrelated = Post.objects.create(author=cls.stranger,
+                                            text='Чужой пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+        cls.expected = sorted(
+            (post for post in cls.posts
+             if post.author == cls.author or post.group_id),
+            key=lambda post: (post.pub_date, post.pk), reverse=True,
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+        caches['ratelimit'].clear()
+
+    def test_merge_streams_deduplicates(self):
+        first, second, third = sorted(
+            self.posts[:3], key=lambda post: (post.pub_date, post.pk),
+            reverse=True)
+        merged = list(merge_streams([[first, third], [first, second], []]))
+        self.assertEqual(merged, [first, second, third])
+
+    def test_feed_merges_authors_and_groups(self):
+        """Лента подписок — посты авторов и групп без повторов."""
+        feed = followed_feed(self.reader)
+        self.assertEqual(feed.count(), len(self.expected))
+        self.assertEqual(feed[0:len(self.expected) + 5], self.expected)
+        self.assertEqual(feed[3:6], self.expected[3:6])
+
+    def test_count_is_cached_until_streams_change(self):
+        """
+        Число постов ленты берётся из кэша, пока не изменится
+        подписка или пост в одном из её потоков.
+        """
+        self.assertEqual(followed_feed(self.reader).count(),
+                         len(self.expected))
+        feed = followed_feed(self.reader)
+        # Без COUNT: только версии потоков из общего кэша
+        with self.assertNumQueries(1):
+            self.assertEqual(feed.count(), len(self.expected))
+
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(followed_feed(self.reader).count(),
+                         len(self.expected) + 1)
+        Post.objects.create(author=self.stranger, text='Пост без подписки')
+        feed = followed_feed(self.reader)
+        with self.assertNumQueries(1):
+            self.assertEqual(feed.count(), len(self.expected) + 1)
+
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        self.assertEqual(followed_feed(self.reader).count(),
+                         Post.objects.count())
+
+    def test_page_reads_each_stream_once(self):
+        """На страницу уходит по одному запросу на каждую подписку."""
+        with self.assertNumQueries(2 + 2):
+            page = followed_feed(self.reader)[0:LIMIT_POST_COEFFICIENT]
+        self.assertEqual(page, self.expected[:LIMIT_POST_COEFFICIENT])
+
+    @override_settings(FEED_MERGE_MAX_ROWS=LIMIT_POST_COEFFICIENT * 2)
+    def test_deep_page_reads_combined_feed(self):
+        """Дальняя страница читается одним запросом, а не по подпискам."""
+        feed = followed_feed(self.reader)
+        with self.assertNumQueries(1):
+            page = feed[LIMIT_POST_COEFFICIENT:LIMIT_POST_COEFFICIENT * 2]
+        self.assertEqual(
+            page, self.expected[LIMIT_POST_COEFFICIENT:
+                                LIMIT_POST_COEFFICIENT * 2])
+
+    def test_follow_index_pages(self):
+        url = reverse('posts:follow_index')
+        pages = []
+        for number in (1, 2):
+            response = self.reader_client.get(url, {'page': number})
+            pages.extend(response.context['page_obj'])
+        self.assertEqual(pages, self.expected)
+        self.assertNotContains(response, self.unrelated.text)
+
+    def test_follow_fragment_reads_whole_feed(self):
+        url = reverse('posts:follow_fragment')
+        response = self.reader_client.get(url)
+        cursor = response['X-Next-Cursor']
+        response = self.reader_client.get(url, {'cursor': cursor})
+        self.assertNotIn('X-Next-Cursor', response)
+        self.assertContains(response, self.expected[-1].text)
+        self.assertNotContains(response, self.expected[0].text)
+
+    def test_group_follow_and_unfollow(self):
+        GroupFollow.objects.all().delete()
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        follow_url = reverse('posts:group_follow', args=[self.group.slug])
+        self.assertRedirects(self.reader_client.get(follow_url), group_url)
+        self.reader_client.get(follow_url)
+        self.assertEqual(GroupFollow.objects.filter(user=self.reader).count(),
+                         1)
+        self.assertTrue(
+            self.reader_client.get(group_url).context['following'])
+
+        self.reader_client.get(
+            reverse('posts:group_unfollow', args=[self.group.slug]))
+        self.assertFalse(GroupFollow.objects.exists())
@@ -0,0 +1,102 @@
+import gzip
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.work_constants import LIMIT_POST_COEFFICIENT
+from posts.models import Follow, Group, Post, User
+
+
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        # Посты создаются по одному, часть с одинаковым временем
+        cls.posts = [
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Пост номер {number}.')
+            for number in range(LIMIT_POST_COEFFICIENT + 3)
+        ]
+        Post.objects.filter(pk__in=[post.pk for post in cls.posts[:4]]
+                            ).update(pub_date=cls.posts[0].pub_date)
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def read_feed(self, client, url):
+        """Проходит ленту по курсорам и возвращает тексты постов."""
+        texts, cursor, pages = [], None, 0
+        while True:
+            response = client.get(url, {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, '<html')
+            self.assertNotContains(response, 'page-link')
+            texts.extend(
+                post.text for post in Post.objects.all()
+                if post.text in response.content.decode()
+            )
+            pages += 1
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                return texts, pages
+
+    def test_feeds_are_read_by_cursor(self):
+        """По курсору лента читается целиком без повторов и пропусков."""
+        for client, name, args in (
+            (self.guest_client, 'posts:index_fragment', []),
+            (self.guest_client, 'posts:group_fragment', [self.group.slug]),
+            (self.guest_client, 'posts:profile_fragment', [self.user]),
+            (self.reader_client, 'posts:follow_fragment', []),
+        ):
+            with self.subTest(name=name):
+                texts, pages = self.read_feed(client,
+                                              reverse(name, args=args))
+                self.assertEqual(pages, 2)
+                self.assertCountEqual(texts,
+                                      [post.text for post in self.posts])
+
+    def test_public_fragment_is_cached(self):
+        """Общая лента кэшируется по курсору и разрешена прокси."""
+        url = reverse('posts:index_fragment')
+        response = self.guest_client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(self.guest_client.get(url).content, response.content)
+
+        response = self.reader_client.get(reverse('posts:follow_fragment'))
+        self.assertIn('private', response['Cache-Control'])
+
+    @override_settings(CACHE_COMPRESS_MIN_SIZE=0)
+    def test_cached_fragment_is_served_precompressed(self):
+        """Из кэша фрагмент отдаётся уже сжатым, если клиент принимает gzip."""
+        url = reverse('posts:index_fragment')
+        plain = self.guest_client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        compressed = self.guest_client.get(url,
+                                           HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed['X-Next-Cursor'], plain['X-Next-Cursor'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('bad', '1_2_3', '1_0',
+                       '99999999999999999999999_1',
+                       '1_99999999999999999999999'):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:index_fragment'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
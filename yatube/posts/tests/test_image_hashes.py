@@ -0,0 +1,212 @@
+import random
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from posts import image_hashes
+from posts.image_hashes import (BKTree, ban_post_images, chunk_keys,
+                                compute_hashes, find_banned, forget_hashes,
+                                hamming, is_copy, search_keys)
+from posts.images import process_post_image
+from posts.models import BannedImage, ImageHashChunk, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_picture(seed):
+    """Картинка из крупных случайных пятен: у разных seed она разная."""
+    blocks = np.random.RandomState(seed).randint(0, 256, (6, 8, 3))
+    return Image.fromarray(blocks.astype(np.uint8)).resize((320, 240),
+                                                           Image.BILINEAR)
+
+
+def upload(image, image_format='PNG', name='picture.png'):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format)
+    return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                              content_type=f'image/{image_format.lower()}')
+
+
+class PerceptualHashTests(SimpleTestCase):
+    def test_resized_copy_is_close(self):
+        """Уменьшенная и пересжатая копия почти не меняет хэши."""
+        original = compute_hashes(make_picture(1))
+        buffer = BytesIO()
+        make_picture(1).resize((160, 120)).save(buffer, format='JPEG',
+                                                quality=70)
+        copy = compute_hashes(Image.open(buffer))
+        other = compute_hashes(make_picture(2))
+        for name in ('ahash', 'dhash', 'phash'):
+            with self.subTest(name=name):
+                self.assertLessEqual(hamming(original[name], copy[name]), 8)
+                self.assertGreater(hamming(original[name], other[name]), 8)
+
+    def test_copy_requires_close_phash(self):
+        """Копия засчитывается, только если близок pHash, по нему индекс."""
+        hashes = {'ahash': 0, 'dhash': 0, 'phash': 0}
+        far = (1 << 20) - 1
+        self.assertTrue(is_copy(hashes, {**hashes, 'ahash': far}))
+        self.assertFalse(is_copy(hashes, {**hashes, 'phash': far}))
+        self.assertFalse(is_copy(hashes,
+                                 {**hashes, 'ahash': far, 'dhash': far}))
+
+    def test_hashes_fit_bigint(self):
+        for value in compute_hashes(make_picture(3)).values():
+            self.assertTrue(-2 ** 63 <= value < 2 ** 63)
+
+    def test_bk_tree_matches_linear_scan(self):
+        rng = random.Random(1)
+        values = [rng.getrandbits(64) for _ in range(300)]
+        tree = BKTree()
+        for value in values:
+            tree.add(value, value)
+        query = values[0] ^ 0b1011
+        for radius in (0, 3, 24, 30):
+            with self.subTest(radius=radius):
+                self.assertCountEqual(
+                    tree.search(query, radius),
+                    [value for value in values
+                     if hamming(query, value) <= radius],
+                )
+
+    def test_multi_index_keys_cover_radius(self):
+        """Хэш в радиусе 8 делит хотя бы одну часть с ключами поиска."""
+        rng = random.Random(2)
+        value = rng.getrandbits(64)
+        keys = set(search_keys(value, 8))
+        for _ in range(200):
+            near = value
+            for bit in rng.sample(range(64), 8):
+                near ^= 1 << bit
+            self.assertTrue(keys & set(chunk_keys(near)))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True)
+class ImageBlocklistTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        from sorl.thumbnail import default
+
+        image_hashes._blocklist = None
+        default.kvstore.local.clear()
+        cache.clear()
+        caches['shared'].clear()
+        caches['ratelimit'].clear()
+
+    def create_post(self, text, image):
+        self.authorized_client.post(reverse('posts:post_create'),
+                                    {'text': text, 'image': image})
+        return Post.objects.get(text=text)
+
+    def test_hashes_stored_at_upload(self):
+        post = self.create_post('Первый', upload(make_picture(1)))
+        expected = compute_hashes(make_picture(1))
+        self.assertEqual(post.image_phash, expected['phash'])
+        self.assertEqual(post.image_dhash, expected['dhash'])
+        self.assertEqual(
+            ImageHashChunk.objects.filter(post=post).count(), 4)
+
+    def test_copy_of_banned_image_is_hidden(self):
+        """Копия запрещённой картинки скрывается фоновой проверкой."""
+        BannedImage.objects.create(reason='Спам',
+                                   **compute_hashes(make_picture(1)))
+        copy = upload(make_picture(1).resize((200, 150)), 'JPEG',
+                      'copy.jpg')
+        self.assertTrue(self.create_post('Копия', copy).is_deleted)
+        self.assertFalse(
+            self.create_post('Другая', upload(make_picture(2))).is_deleted)
+
+    def test_ban_hides_existing_copies(self):
+        first = self.create_post('Первый', upload(make_picture(1)))
+        copy = self.create_post(
+            'Копия', upload(make_picture(1).resize((200, 150))))
+        other = self.create_post('Другая', upload(make_picture(2)))
+
+        self.assertEqual(ban_post_images(Post.objects.filter(pk=first.pk)),
+                         2)
+        self.assertEqual(
+            list(Post.objects.filter(is_deleted=True).order_by('pk')),
+            [first, copy],
+        )
+        self.assertFalse(Post.objects.get(pk=other.pk).is_deleted)
+        self.assertEqual(BannedImage.objects.count(), 1)
+
+    def test_banned_images_are_not_added_in_admin(self):
+        """Запрет создаётся только из постов: форма добавления закрыта."""
+        admin = User.objects.create_superuser('admin', 'admin@example.com',
+                                              'password')
+        self.authorized_client.force_login(admin)
+        url = reverse('admin:posts_bannedimage_add')
+        self.assertEqual(self.authorized_client.get(url).status_code, 403)
+        response = self.authorized_client.post(url, {'reason': 'Спам'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(BannedImage.objects.exists())
+
+    def test_ban_from_other_worker_is_seen(self):
+        """Запрет, сохранённый в другом процессе, виден после проверки."""
+        hashes = compute_hashes(make_picture(1))
+        self.assertIsNone(find_banned(hashes))
+        # bulk_create не шлёт сигналов, как и запрет из другого воркера
+        BannedImage.objects.bulk_create([BannedImage(reason='Спам',
+                                                     **hashes)])
+        self.assertIsNone(find_banned(hashes))
+        with override_settings(IMAGE_BLOCKLIST_CHECK_INTERVAL=0):
+            self.assertEqual(find_banned(hashes),
+                             BannedImage.objects.get().pk)
+
+    def test_build_image_hashes_backfills_old_images(self):
+        """Команда считает хэши картинок, загруженных до их подсчёта."""
+        post = self.create_post('Старый', upload(make_picture(1)))
+        copy = self.create_post(
+            'Копия', upload(make_picture(1).resize((200, 150))))
+        for old in (post, copy):
+            forget_hashes(old.pk)
+        Post.objects.create(author=self.user, text='Без файла',
+                            image='posts/missing.png')
+        self.assertEqual(ban_post_images(Post.objects.filter(pk=post.pk)),
+                         0)
+
+        out, err = StringIO(), StringIO()
+        call_command('build_image_hashes', batch_size=2, stdout=out,
+                     stderr=err)
+        self.assertIn('постов: 2, скрыто копий запрещённых: 0, ошибок: 1',
+                      out.getvalue())
+        self.assertIn('posts/missing.png', err.getvalue())
+        post.refresh_from_db()
+        self.assertIsNotNone(post.image_phash)
+        self.assertEqual(
+            ImageHashChunk.objects.filter(post=post).count(), 4)
+        self.assertEqual(ban_post_images(Post.objects.filter(pk=post.pk)),
+                         2)
+
+    def test_blocklist_checked_when_processing_fails(self):
+        """Сбой обработки картинки не отменяет проверку по списку."""
+        post = self.create_post('Пост', upload(make_picture(1)))
+        BannedImage.objects.create(reason='Спам',
+                                   **compute_hashes(make_picture(1)))
+        with mock.patch('posts.images.normalize_post_image',
+                        side_effect=OSError):
+            with self.assertRaises(OSError):
+                process_post_image(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.is_deleted)
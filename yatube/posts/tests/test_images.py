@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.templatetags.responsive_images import cached_thumbnail, renditions
+from posts.images import variant_formats
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_jpeg(size, with_exif=True):
+    image = Image.new('RGB', size, color=(200, 100, 50))
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera'
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG',
+               exif=exif.tobytes() if with_exif else b'')
+    return SimpleUploadedFile(name='photo.jpg', content=buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True,
+                   POST_IMAGE_MAX_SIDE=100)
+class PostImageNormalizationTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+        caches['ratelimit'].clear()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'photo', 'image': image}
+        )
+
+    def test_large_image_downscaled_and_exif_stripped(self):
+        """Большая картинка уменьшается, EXIF из неё удаляется."""
+        self.create_post(make_jpeg((400, 200)))
+        post = Post.objects.get(text='photo')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertNotIn('exif', image.info)
+
+    def test_small_image_without_metadata_kept(self):
+        """Маленькая картинка без метаданных сохраняется как есть."""
+        upload = make_jpeg((50, 20), with_exif=False)
+        content = upload.read()
+        upload.seek(0)
+        self.create_post(upload)
+        post = Post.objects.get(text='photo')
+        with open(post.image.path, 'rb') as image_file:
+            self.assertEqual(image_file.read(), content)
+
+    @skipUnless('WEBP' in variant_formats(), 'Pillow собран без WebP')
+    def test_webp_variant_stored(self):
+        """Рядом с JPEG сохраняется вариант в WebP."""
+        self.create_post(make_jpeg((400, 200)))
+        post = Post.objects.get(text='photo')
+        storage = post.image.storage
+        self.assertTrue(storage.exists(
+            storage.variant_name(post.image.name, 'webp')))
+
+    def test_renditions_built_at_upload(self):
+        """Миниатюры для шаблонов постов строятся при загрузке."""
+        self.create_post(make_jpeg((400, 200)))
+        post = Post.objects.get(text='photo')
+        for geometry, options in settings.POST_IMAGE_RENDITIONS:
+            for _, thumbnail_geometry, thumbnail_options in renditions(
+                    geometry, options):
+                with self.subTest(geometry=thumbnail_geometry):
+                    self.assertIsNotNone(cached_thumbnail(
+                        post.image, thumbnail_geometry, thumbnail_options))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с огромным числом пикселей не проходит валидацию."""
+        response = self.create_post(make_jpeg((20, 20)))
+        self.assertFalse(Post.objects.filter(text='photo').exists())
+        self.assertTrue(response.context['form'].errors['image'])
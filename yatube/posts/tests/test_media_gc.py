@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from sorl.thumbnail import default, get_thumbnail
+
+from posts.media_gc import collect_garbage, list_shards
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, GC_MEDIA_MIN_AGE=0)
+class GarbageCollectorTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=user, text='Пост',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.storage = self.post.image.storage
+        self.thumbnail = get_thumbnail(self.post.image, '20x10')
+        self.variant = self.storage.save_variant(
+            self.post.image.name, 'webp', ContentFile(b'webp'))
+        self.orphan = self.storage.save('posts/zz/orphan.gif',
+                                        ContentFile(SMALL_GIF))
+        self.orphan_thumbnail = default.storage.save(
+            'cache/zz/zz/orphan.jpg', ContentFile(b'jpeg'))
+
+    def tearDown(self):
+        cache.clear()
+        default.kvstore.local.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_unreferenced_files_are_deleted(self):
+        """Удаляются только файлы без поста и без записи sorl."""
+        out = StringIO()
+        call_command('gc_media', stdout=out)
+        self.assertIn('Удалено файлов: 2', out.getvalue())
+        self.assertIn(f'({len(SMALL_GIF) + 4} байт)', out.getvalue())
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertFalse(default.storage.exists(self.orphan_thumbnail))
+        for name in (self.post.image.name, self.variant,
+                     self.thumbnail.name):
+            with self.subTest(name=name):
+                self.assertTrue(self.storage.exists(name))
+
+    def test_cold_cache_keeps_live_thumbnails(self):
+        """
+        Отдельный процесс команды с пустыми кэшами
+        не удаляет миниатюры, о которых знает таблица sorl.
+        """
+        cache.clear()
+        default.kvstore.local.clear()
+        self.assertEqual(collect_garbage(), (2, len(SMALL_GIF) + 4))
+        self.assertTrue(default.storage.exists(self.thumbnail.name))
+
+    @override_settings(
+        THUMBNAIL_KVSTORE='sorl.thumbnail.kvstores.redis_kvstore.KVStore')
+    def test_refuses_kvstore_without_table(self):
+        """Без таблицы метаданных сборщик не запускается."""
+        with self.assertRaises(ImproperlyConfigured):
+            collect_garbage()
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_dry_run_and_min_age(self):
+        """Пробный прогон и молодые файлы ничего не удаляют."""
+        self.assertEqual(collect_garbage(dry_run=True),
+                         (2, len(SMALL_GIF) + 4))
+        self.assertEqual(collect_garbage(min_age=3600), (0, 0))
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_image_names_searched_by_range(self):
+        """
+        Имена постов ищутся диапазонами по индексу, без LIKE и REGEXP;
+        старые картинки в корневом каталоге тоже проверяются.
+        """
+        legacy, old = 'posts/legacy.gif', 'posts/old.gif'
+        for name in (legacy, old):
+            with open(self.storage.path(name), 'wb') as image_file:
+                image_file.write(SMALL_GIF)
+        Post.objects.create(author=self.post.author, text='Старый пост',
+                            image=legacy)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(collect_garbage(), (3, 2 * len(SMALL_GIF) + 4))
+        self.assertTrue(self.storage.exists(legacy))
+        self.assertFalse(self.storage.exists(old))
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('LIKE', query['sql'])
+                self.assertNotIn('REGEXP', query['sql'])
+
+    def test_incremental_runs_cover_all_shards(self):
+        """С limit каталоги обходятся по очереди с места прошлого запуска."""
+        deleted = 0
+        for _ in list_shards():
+            # Каждый запуск команды начинается с пустым кэшем процесса
+            cache.clear()
+            deleted += collect_garbage(limit=1)[0]
+        self.assertEqual(deleted, 2)
+        self.assertEqual(collect_garbage(), (0, 0))
@@ -0,0 +1,84 @@
+import warnings
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import CacheKeyWarning
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import object_cache_key
+from posts.models import Group, User
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def tearDown(self):
+        cache.clear()
+        caches['object_misses'].clear()
+
+    def test_group_and_author_are_cached(self):
+        """Повторный запрос не ищет группу и автора в базе."""
+        for url in (
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                with self.assertNumQueries(2):
+                    # Остаются число постов страницы и его поиск
+                    # в общем кэше
+                    self.guest_client.get(url)
+
+    def test_missing_group_is_cached(self):
+        """404 кэшируется, пока группа с таким адресом не появится."""
+        url = reverse('posts:group_list', args=['new-slug'])
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.guest_client.get(url).status_code, 404)
+        # Промахи не занимают место существующих объектов
+        self.assertIsNone(cache.get(object_cache_key(Group, 'slug',
+                                                     'new-slug')))
+        Group.objects.create(title='Новая', slug='new-slug',
+                             description='Описание')
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_renamed_group_is_invalidated(self):
+        """После смены адреса группы старый адрес отдаёт 404."""
+        old_url = reverse('posts:group_list', args=[self.group.slug])
+        self.guest_client.get(old_url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assertEqual(self.guest_client.get(old_url).status_code, 404)
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=['renamed']))
+        self.assertEqual(response.context['group'].slug, 'renamed')
+
+    def test_keys_do_not_contain_raw_values(self):
+        """Значение из адреса попадает в ключ кэша только хэшем."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            response = self.guest_client.get(
+                reverse('posts:profile', args=['имя' * 100]))
+        self.assertEqual(response.status_code, 404)
+        key = object_cache_key(Group, 'slug', 'Тестовый slug')
+        self.assertTrue(key.isascii())
+        self.assertNotIn(' ', key)
+
+    def test_password_hash_is_not_cached(self):
+        self.guest_client.get(
+            reverse('posts:profile', args=[self.user.username]))
+        author = cache.get(object_cache_key(User, 'username',
+                                            self.user.username))
+        self.assertEqual(author.username, self.user.username)
+        self.assertIn('password', author.get_deferred_fields())
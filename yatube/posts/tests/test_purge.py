@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.media_gc import collect_garbage
+from posts.models import Comment, Follow, Group, Post, User
+from posts.purge import soft_delete_posts, soft_delete_users
+from users.models import PendingDeletion
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, BACKGROUND_TASKS_EAGER=True,
+                   PURGE_BATCH_SIZE=2, PURGE_BATCH_PAUSE=0)
+class SoftDeleteTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            author=self.author,
+            text='Пост автора',
+            group=self.group,
+            image=SimpleUploadedFile(name='small.gif', content=SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        for number in range(5):
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text=f'Комментарий {number}')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.guest_client = Client()
+
+    def test_deleted_user_is_hidden_immediately(self):
+        """Контент удалённого пользователя пропадает до фоновой очистки."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.get(reverse('posts:index'))
+        soft_delete_users(User.objects.filter(pk=self.author.pk))
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertTrue(
+            PendingDeletion.objects.filter(user=self.author).exists())
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.post.text)
+        for name, argument in (
+            ('posts:post_detail', self.post.id),
+            ('posts:profile', self.author.username),
+        ):
+            with self.subTest(name=name):
+                response = self.guest_client.get(
+                    reverse(name, args=[argument]))
+                self.assertEqual(response.status_code, 404)
+        # Закэшированный пользователь тоже сбрасывается: сессия недействительна
+        response = author_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Пользователь:')
+
+    def test_deactivated_user_stays_visible(self):
+        """Отключённый в админке, но не удалённый автор не скрывается."""
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+        response = self.guest_client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertContains(response, self.post.text)
+
+    def test_deleted_user_feeds_invalidated(self):
+        """Закэшированная лента группы поста автора сбрасывается."""
+        url = reverse('posts:group_fragment', args=[self.group.slug])
+        self.assertContains(self.guest_client.get(url), self.post.text)
+        soft_delete_users(User.objects.filter(pk=self.author.pk))
+        self.assertNotContains(self.guest_client.get(url), self.post.text)
+
+    def test_deleted_user_is_purged(self):
+        """Пользователь и всё связанное с ним удаляет purge_deleted."""
+        storage = self.post.image.storage
+        image_name = self.post.image.name
+        soft_delete_users(User.objects.filter(pk=self.author.pk))
+        call_command('purge_deleted', stdout=StringIO())
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        collect_garbage(min_age=0)
+        self.assertFalse(storage.exists(image_name))
+
+    def test_deleted_post_is_hidden_and_purged(self):
+        """Удалённый пост скрывается сразу, а удаляет его purge_deleted."""
+        soft_delete_posts(Post.objects.filter(pk=self.post.pk))
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        self.assertEqual(response.status_code, 404)
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=[self.group.slug]))
+        self.assertNotContains(response, self.post.text)
+
+        call_command('purge_deleted', stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
@@ -0,0 +1,141 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Group, Post, Reaction, ReactionCounter, User
+from posts.purge import purge_user
+from posts.reactions import (add_reactions, attach_reactions,
+                             reaction_count_key, reaction_counts,
+                             toggle_reaction)
+
+
+class ReactionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Пост')
+        cls.other_post = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.url = reverse('posts:post_reaction', args=[self.post.id])
+
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+        caches['ratelimit'].clear()
+
+    def test_toggle_endpoint(self):
+        """Повторный запрос снимает реакцию, счётчик следует за ней."""
+        response = self.reader_client.post(self.url)
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[self.post.id]))
+        self.assertTrue(
+            Reaction.objects.filter(user=self.reader, post=self.post).exists()
+        )
+        self.assertEqual(reaction_counts([self.post.id]), {self.post.id: 1})
+
+        detail = self.reader_client.get(response.url)
+        self.assertTrue(detail.context['post'].liked)
+        self.assertEqual(detail.context['post'].reaction_count, 1)
+
+        self.reader_client.post(self.url)
+        self.assertFalse(Reaction.objects.exists())
+        cache.clear()
+        self.assertEqual(reaction_counts([self.post.id]), {self.post.id: 0})
+
+    def test_toggle_requires_post_and_login(self):
+        self.assertEqual(self.reader_client.get(self.url).status_code, 405)
+        response = Client().post(self.url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={self.url}')
+
+    def test_toggle_redirects_back_to_safe_url_only(self):
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        response = self.reader_client.post(self.url, {'next': group_url})
+        self.assertRedirects(response, group_url)
+        response = self.reader_client.post(
+            self.url, {'next': 'https://example.com/'})
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[self.post.id]))
+
+    @override_settings(REACTION_COUNTER_SHARDS=4)
+    def test_count_is_sum_of_shards(self):
+        """Приращения расходятся по частям, читается их сумма."""
+        with mock.patch('posts.reactions.random.randrange',
+                        side_effect=[0, 1, 2, 1, 3]):
+            for delta in (1, 1, 1, -1, 1):
+                add_reactions(self.post.id, delta)
+        self.assertEqual(
+            ReactionCounter.objects.filter(post=self.post).count(), 4)
+        self.assertEqual(reaction_counts([self.post.id, self.other_post.id]),
+                         {self.post.id: 3, self.other_post.id: 0})
+
+    def test_liked_flags_for_page_in_one_query(self):
+        """Отметки пользователя на всю страницу читаются одним запросом."""
+        toggle_reaction(self.reader, self.other_post)
+        posts = list(Post.objects.order_by('pk'))
+        reaction_counts([post.pk for post in posts])
+        with self.assertNumQueries(1):
+            attach_reactions(posts, self.reader)
+        self.assertEqual([post.liked for post in posts], [False, True])
+        self.assertEqual([post.reaction_count for post in posts], [0, 1])
+
+    def test_feeds_mark_liked_posts(self):
+        toggle_reaction(self.reader, self.post)
+        response = self.reader_client.get(
+            reverse('posts:group_list', args=[self.group.slug]))
+        post = response.context['page_obj'][0]
+        self.assertTrue(post.liked)
+        self.assertContains(response, 'Нравится: 1 (и вам)')
+
+    def test_shared_feed_has_no_personal_marks(self):
+        """Общая кэшируемая лента показывает только число реакций."""
+        toggle_reaction(self.reader, self.post)
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Нравится: 1')
+        self.assertNotContains(response, '(и вам)')
+
+    def test_purge_user_removes_reactions_from_counts(self):
+        toggle_reaction(self.reader, self.post)
+        toggle_reaction(self.user, self.post)
+        with override_settings(PURGE_BATCH_PAUSE=0):
+            purge_user(self.reader.pk)
+        cache.clear()
+        self.assertEqual(reaction_counts([self.post.id]), {self.post.id: 1})
+
+
+class CachedReactionCountTests(TransactionTestCase):
+    """Число в кэше правится после коммита, поэтому нужны транзакции."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+        caches['ratelimit'].clear()
+
+    def test_counts_are_cached_and_updated_in_place(self):
+        """Прочитанное число живёт в кэше и правится без пересчёта."""
+        reaction_counts([self.post.id])
+        toggle_reaction(self.reader, self.post)
+        self.assertEqual(cache.get(reaction_count_key(self.post.id)), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(reaction_counts([self.post.id]),
+                             {self.post.id: 1})
+        toggle_reaction(self.reader, self.post)
+        self.assertEqual(reaction_counts([self.post.id]), {self.post.id: 0})
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import fragment_version
+from posts.models import Group, Post, User
+from posts.scheduler import PublishScheduler, schedule_post
+
+
+class ScheduledPublishingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+        caches['ratelimit'].clear()
+
+    def scheduled_post(self, publish_at, text='Пост по расписанию'):
+        post = Post(author=self.user, group=self.group, text=text)
+        schedule_post(post, publish_at)
+        post.save()
+        return post
+
+    def test_create_scheduled_post(self):
+        """Пост с временем публикации не виден в лентах до срока."""
+        publish_at = timezone.now() + timedelta(hours=1)
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Отложенный пост',
+            'publish_at': publish_at.strftime('%d.%m.%Y %H:%M'),
+        })
+        post = Post.objects.get(text='Отложенный пост')
+        self.assertFalse(post.is_published)
+        self.assertFalse(Post.objects.visible().exists())
+        response = Client().get(reverse('posts:post_detail', args=[post.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_author_sees_and_edits_scheduled_post(self):
+        """Автор открывает и правит свой ещё не опубликованный пост."""
+        post = self.scheduled_post(timezone.now() + timedelta(hours=1))
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.id]))
+        self.assertContains(response, post.text)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.id]),
+            {'text': 'Исправленный пост'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertFalse(post.is_published)
+        other = User.objects.create_user(username='other')
+        self.authorized_client.force_login(other)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[post.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_publish_at_must_be_in_future(self):
+        response = self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост',
+            'publish_at': '01.01.2000 10:00',
+        })
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(response, 'schedule_form', 'publish_at',
+                             'Время публикации должно быть в будущем.')
+
+    def test_scheduler_publishes_due_posts_in_order(self):
+        now = timezone.now()
+        later = self.scheduled_post(now + timedelta(hours=2), 'Позже')
+        sooner = self.scheduled_post(now + timedelta(hours=1), 'Раньше')
+        version = fragment_version('index_page')
+
+        scheduler = PublishScheduler()
+        scheduler.load()
+        self.assertEqual([pk for _, pk in scheduler.queue[:1]], [sooner.pk])
+        self.assertEqual(scheduler.seconds_to_next(now), 60)
+        self.assertEqual(
+            scheduler.seconds_to_next(now + timedelta(minutes=59, seconds=30)),
+            30,
+        )
+        self.assertEqual(scheduler.publish_due(now), 0)
+        self.assertEqual(
+            scheduler.publish_due(now + timedelta(hours=1, minutes=1)), 1)
+
+        sooner.refresh_from_db()
+        self.assertTrue(sooner.is_published)
+        self.assertEqual(sooner.pub_date, sooner.publish_at)
+        self.assertEqual(list(Post.objects.visible()), [sooner])
+        # Планировщик - отдельный процесс: версия видна воркеру
+        # с другим кэшем процесса
+        cache.clear()
+        self.assertGreater(fragment_version('index_page'), version)
+        self.assertEqual(scheduler.queue, [(later.publish_at, later.pk)])
+
+    @override_settings(SCHEDULER_BATCH_SIZE=2)
+    def test_run_once_drains_all_due_posts(self):
+        """Наступившие посты публикуются пачками, будущие остаются."""
+        past = timezone.now() - timedelta(minutes=1)
+        for number in range(5):
+            self.scheduled_post(past - timedelta(minutes=number))
+        future = self.scheduled_post(timezone.now() + timedelta(hours=1))
+        out = StringIO()
+        call_command('publish_scheduled', once=True, stdout=out)
+        self.assertIn('Опубликовано постов: 5', out.getvalue())
+        self.assertEqual(
+            list(Post.objects.filter(is_published=False)), [future])
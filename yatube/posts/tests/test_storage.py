@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.media_gc import collect_garbage
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+        caches['ratelimit'].clear()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post_with_image(self, filename):
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': filename,
+            'image': SimpleUploadedFile(name=filename, content=SMALL_GIF,
+                                        content_type='image/gif'),
+        })
+        return Post.objects.get(text=filename)
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые картинки хранятся в одном файле под хэшем."""
+        first = self.create_post_with_image('first.gif')
+        second = self.create_post_with_image('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertNotIn('first', first.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_streaming_save_matches_upload_hash(self):
+        """Файл без посчитанного хэша получает то же имя."""
+        uploaded = self.create_post_with_image('uploaded.gif')
+        post = Post.objects.create(text='saved', author=self.user)
+        post.image.save('other.gif', ContentFile(SMALL_GIF))
+        self.assertEqual(post.image.name, uploaded.image.name)
+
+    def test_file_removed_with_last_reference(self):
+        """Сборщик удаляет файл только после последнего ссылающегося поста."""
+        first = self.create_post_with_image('first.gif')
+        second = self.create_post_with_image('second.gif')
+        path = first.image.path
+        first.delete()
+        collect_garbage(min_age=0)
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertTrue(os.path.exists(path))
+        collect_garbage(min_age=0)
+        self.assertFalse(os.path.exists(path))
+
+    def test_reused_file_is_touched(self):
+        """
+        Повторная загрузка освежает время изменения файла,
+        чтобы сборщик не удалил его до коммита нового поста.
+        """
+        post = self.create_post_with_image('first.gif')
+        path = post.image.path
+        os.utime(path, (0, 0))
+        post.delete()
+        self.assertEqual(collect_garbage(min_age=3600, dry_run=True)[0], 1)
+        storage = post.image.storage
+        self.assertEqual(storage.save('posts/other.gif',
+                                      ContentFile(SMALL_GIF)),
+                         post.image.name)
+        self.assertEqual(collect_garbage(min_age=3600), (0, 0))
+        self.assertTrue(os.path.exists(path))
+
+    def test_replaced_image_released_on_edit(self):
+        """Картинку, заменённую при правке поста, удаляет сборщик."""
+        post = self.create_post_with_image('first.gif')
+        path = post.image.path
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.id]),
+            {
+                'text': 'edited',
+                'image': SimpleUploadedFile(
+                    name='new.gif', content=SMALL_GIF + b'\x00',
+                    content_type='image/gif'),
+            },
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.path, path)
+        collect_garbage(min_age=0)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_concurrent_save_of_same_content(self):
+        """
+        Файл, который параллельная загрузка создала после проверки,
+        считается уже сохранённым: имя не подбирается заново.
+        """
+        uploaded = self.create_post_with_image('first.gif')
+        storage = uploaded.image.storage
+        content = ContentFile(SMALL_GIF)
+        content.content_hash = os.path.basename(
+            os.path.splitext(uploaded.image.name)[0])
+        with mock.patch.object(storage, 'touch',
+                               side_effect=[False, True]) as touch:
+            name = storage.save('posts/race.gif', content)
+        self.assertEqual(name, uploaded.image.name)
+        self.assertEqual(touch.call_count, 2)
+        self.assertFalse(storage.create(name, content))
+
+    def test_variant_saved_twice(self):
+        """Повторная запись того же варианта не зацикливается."""
+        post = self.create_post_with_image('first.gif')
+        storage = post.image.storage
+        for _ in range(2):
+            variant = storage.save_variant(post.image.name, 'webp',
+                                           ContentFile(b'webp'))
+        self.assertEqual(variant,
+                         storage.variant_name(post.image.name, 'webp'))
+        with storage.open(variant) as variant_file:
+            self.assertEqual(variant_file.read(), b'webp')
@@ -0,0 +1,96 @@
+import re
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.constants_tests import LIMIT_POST_TEST
+from posts.models import Follow, Group, Post, User
+from posts.utils import create_post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def normalize_html(content):
+    """Убирает из HTML незначащие пробельные символы."""
+    content = re.sub(r'\s+', ' ', content.decode())
+    return re.sub(r'>\s+<', '><', content).strip()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FeedTemplateEnginesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth',
+                                            first_name='Имя "в кавычках"')
+        cls.follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        create_post(LIMIT_POST_TEST, cls.user, cls.group)
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        Post.objects.create(
+            author=cls.user,
+            text='Пост с <тегами> & "кавычками"',
+            group=cls.group,
+            image=SimpleUploadedFile(name='small.gif', content=small_gif,
+                                     content_type='image/gif'),
+        )
+        cls.feeds = (
+            ('posts:index', None),
+            ('posts:group_list', [cls.group.slug]),
+            ('posts:profile', [cls.user.username]),
+            ('posts:follow_index', None),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_content(self, view_name, args, engine, page):
+        cache.clear()
+        engines = {view_name: engine} if engine else {}
+        with override_settings(FEED_TEMPLATE_ENGINES=engines):
+            response = self.client.get(reverse(view_name, args=args),
+                                       {'page': page})
+        return normalize_html(response.content)
+
+    def test_jinja2_feeds_match_django_templates(self):
+        """Ленты, отрендеренные Jinja2 и Django, дают одинаковый HTML."""
+        for view_name, args in self.feeds:
+            for page in (1, 2):
+                with self.subTest(view_name=view_name, page=page):
+                    django_content = self.get_content(view_name, args,
+                                                      None, page)
+                    jinja_content = self.get_content(view_name, args,
+                                                     'jinja2', page)
+                    self.assertIn('page-link', django_content)
+                    self.assertEqual(django_content, jinja_content)
+
+    def test_jinja2_feed_renders_thumbnail(self):
+        """Jinja2-шаблон ленты выводит миниатюру картинки поста."""
+        content = self.get_content('posts:index', None, 'jinja2', 1)
+        self.assertIn('<img class="card-img my-2"', content)
@@ -1,6 +1,6 @@
 from http import HTTPStatus
 
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.test import TestCase, Client
 from django.urls import reverse
 
@@ -49,6 +49,7 @@ class URLTestsPosts(TestCase):
 
     def tearDown(self):
         cache.clear()
+        caches['ratelimit'].clear()
 
     def test_urls_exists_at_desired_location_posts(self):
         """URL-адрес доступен для неавторизованного пользователя."""
@@ -3,7 +3,7 @@ import tempfile
 
 from django import forms
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
@@ -68,6 +68,7 @@ class PostPagesTestsPosts(TestCase):
 
     def tearDown(self):
         cache.clear()
+        caches['ratelimit'].clear()
 
     def test_index_group_profile_show_correct_context_posts(self):
         """
@@ -169,6 +170,44 @@ class PostPagesTestsPosts(TestCase):
         content_third = third_response.content
         self.assertNotEqual(content_second, content_third)
 
+    def test_cache_index_shared_between_users(self):
+        """
+        Список постов index кэшируется один раз для всех,
+        а шапка страницы рендерится для каждого пользователя отдельно.
+        """
+        template_address, _ = self.index
+        self.guest_client.get(reverse(template_address))
+        new_post = Post.objects.create(
+            text='test_post_after_cache',
+            author=PostPagesTestsPosts.user,
+        )
+        response = self.authorized_client.get(reverse(template_address))
+        self.assertNotContains(response, new_post.text)
+        self.assertContains(response, f'Пользователь: {self.user.username}')
+        response = self.guest_client.get(reverse(template_address))
+        self.assertNotContains(response, 'Пользователь:')
+
+    def test_cache_index_normalizes_page(self):
+        """
+        Без номера, page=1 и неверный номер дают одну запись кэша,
+        а контекст при попадании в кэш тот же, что и при промахе.
+        """
+        url = reverse(self.index[0])
+        first = self.guest_client.get(url)
+        new_post = Post.objects.create(
+            text='test_post_after_cache',
+            author=PostPagesTestsPosts.user,
+        )
+        for page in ('1', 'junk', ''):
+            with self.subTest(page=page):
+                response = self.guest_client.get(url, {'page': page})
+                self.assertNotContains(response, new_post.text)
+                self.assertEqual(response.context['page_obj'].number, 1)
+                self.assertEqual(
+                    response.context['page_obj'].elided_page_range,
+                    first.context['page_obj'].elided_page_range,
+                )
+
 
 class PostPaginatorTestsPosts(TestCase):
     @classmethod
@@ -218,6 +257,15 @@ class PostPaginatorTestsPosts(TestCase):
                 self.assertEqual(len(response.context['page_obj']),
                                  LIMIT_POST_COEFFICIENT2)
 
+    def test_paginator_elided_page_range(self):
+        """Номера страниц для навигации передаются в page_obj."""
+        template_address, argument = self.group_page
+        response = self.guest_client.get(
+            reverse(template_address, args=argument))
+        self.assertEqual(response.context['page_obj'].elided_page_range,
+                         [1, 2])
+        self.assertContains(response, '?page=2')
+
 
 class FollowTestsPosts(TestCase):
     @classmethod
@@ -261,6 +309,7 @@ class FollowTestsPosts(TestCase):
 
     def tearDown(self):
         cache.clear()
+        caches['ratelimit'].clear()
 
     def test_follow(self):
         """Тест создания и удаления подписки."""
@@ -0,0 +1,38 @@
+import hashlib
+
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             TemporaryFileUploadHandler)
+
+
+class ContentHashMixin:
+    """
+    Считает sha256 файла по мере получения данных запроса
+    и сохраняет его в атрибуте content_hash загруженного файла.
+    ContentHashStorage использует его, чтобы не перечитывать файл.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.content_hash = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        if remaining is None:
+            self.content_hash.update(raw_data)
+        return remaining
+
+    def file_complete(self, file_size):
+        file_obj = super().file_complete(file_size)
+        if file_obj is not None:
+            file_obj.content_hash = self.content_hash.hexdigest()
+        return file_obj
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin,
+                                     MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin,
+                                        TemporaryFileUploadHandler):
+    pass
@@ -1,16 +1,177 @@
-from django.core.paginator import Paginator
+from datetime import datetime, timedelta, timezone
 
-from .models import Post
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.safestring import mark_safe
 
+from core.cache import cached_result, get_cached_object_or_404
+from core.compression import GzipText, accepts_gzip
+from core.paginator import CachedCountPaginator
+from core.work_constants import LIMIT_POST_COEFFICIENT, NUMBER_OF_SECONDS
+from .feeds import MergedFeed, posts_after
+from .media import prefetch_thumbnails
+from .models import Post, User
+from .reactions import attach_reactions
 
-def run_pag(list_obj, request, filters):
+
+CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Наибольший id, который база примет в параметре запроса (BIGINT)
+MAX_CURSOR_PK = 2 ** 63 - 1
+
+
+def paginate(list_obj, request, filters, count_key=None, estimate=False):
+    """
+    Страница списка с нормализованным номером: отсутствующий или
+    неверный номер даёт первую страницу, слишком большой — последнюю.
+    Номера страниц для навигации лежат в page_obj.elided_page_range.
+    Берётся только число объектов, сами посты выбираются при обращении.
+    """
+    paginator = CachedCountPaginator(list_obj, filters, count_key=count_key,
+                                     estimate=estimate)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.elided_page_range = list(
+        paginator.get_elided_page_range(page_obj.number)
+    )
+    return page_obj
+
+
+def prepare_page(page_obj, user=None):
+    """Загружает миниатюры постов страницы и отмечает реакции user."""
+    prefetch_thumbnails(page_obj)
+    attach_reactions(page_obj, user)
+    return page_obj
+
+
+def run_pag(list_obj, request, filters, count_key=None, estimate=False,
+            user=None):
     """
     Функция Paginator для переработки списка постов
-    в объект типа page_object
+    в объект типа page_object. count_key задаёт вид выборки,
+    число объектов которой можно брать из кэша. Номера страниц
+    для навигации лежат в page_obj.elided_page_range.
+    Реакции текущего пользователя отмечаются, только если передан user:
+    страницы общих лент кэшируются для всех.
+    """
+    return prepare_page(
+        paginate(list_obj, request, filters, count_key=count_key,
+                 estimate=estimate),
+        user,
+    )
+
+
+def get_active_author_or_404(username):
+    """Автор по имени из кэша; удалённые авторы недоступны."""
+    return get_cached_object_or_404(User, 'username', username)
+
+
+def feed_engine(view_name):
+    """
+    Возвращает движок шаблонов, выбранный для ленты view
+    в настройке FEED_TEMPLATE_ENGINES, или None для движка по умолчанию
+    """
+    engine = settings.FEED_TEMPLATE_ENGINES.get(view_name)
+    return None if engine == 'django' else engine
+
+
+def render_post_list(view_name, template_name, page_obj):
+    """Рендерит список постов ленты выбранным для view движком шаблонов"""
+    using = feed_engine(view_name)
+    return mark_safe(render_to_string(template_name, {'page_obj': page_obj},
+                                      using=using))
+
+
+def encode_cursor(post):
+    """Курсор ленты: время публикации в микросекундах и id поста."""
+    microseconds = (post.pub_date - CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f'{microseconds}_{post.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Время публикации и id поста из курсора ленты. Для неверного
+    или выходящего за допустимые пределы курсора выбрасывается ValueError.
+    """
+    microseconds, pk = (int(part) for part in cursor.split('_'))
+    if not 0 < pk <= MAX_CURSOR_PK:
+        raise ValueError(f'id поста в курсоре вне пределов: {pk}')
+    try:
+        pub_date = CURSOR_EPOCH + timedelta(microseconds=microseconds)
+    except OverflowError:
+        raise ValueError(
+            f'Время в курсоре вне пределов: {microseconds}') from None
+    return pub_date, pk
+
+
+def cursor_page(post_list, cursor, limit, user=None):
     """
-    paginator = Paginator(list_obj, filters)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    Следующие limit постов ленты после курсора и курсор продолжения.
+    Выборка идёт по индексу post_pub_date_id_idx без OFFSET и COUNT(*),
+    поэтому её стоимость не зависит от глубины прокрутки; MergedFeed
+    так же читает каждую свою выборку. Для неверного курсора
+    выбрасывается ValueError.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if isinstance(post_list, MergedFeed):
+        posts = post_list.read(limit + 1, after)
+    else:
+        posts = list(
+            posts_after(post_list, after)
+            .select_related('author', 'group')[:limit + 1]
+        )
+    prefetch_thumbnails(posts[:limit])
+    attach_reactions(posts[:limit], user)
+    if len(posts) <= limit:
+        return posts, None
+    return posts[:limit], encode_cursor(posts[limit - 1])
+
+
+def feed_fragment_response(request, post_list, fragment_name=None,
+                           show_group_link=True):
+    """
+    Ответ для бесконечной прокрутки: только HTML постов без базового
+    шаблона и пагинатора, курсор продолжения в заголовке X-Next-Cursor.
+    Общие ленты (fragment_name задан) кэшируются по курсору на сервере
+    и разрешены к кэшированию в браузере и прокси; из кэша они
+    отдаются уже сжатыми gzip, если клиент это принимает.
+    """
+    cursor = request.GET.get('cursor')
+    user = request.user if fragment_name is None else None
+
+    def render_fragment():
+        posts, next_cursor = cursor_page(post_list, cursor,
+                                         LIMIT_POST_COEFFICIENT, user)
+        html = render_to_string('posts/includes/post_items.html', {
+            'posts': posts,
+            'show_group_link': show_group_link,
+        })
+        return html, next_cursor
+
+    try:
+        if fragment_name is None:
+            html, next_cursor = render_fragment()
+        else:
+            html, next_cursor = cached_result(
+                fragment_name, ['cursor', cursor], NUMBER_OF_SECONDS,
+                render_fragment, packed=True,
+            )
+    except ValueError:
+        return HttpResponseBadRequest()
+    if isinstance(html, GzipText) and accepts_gzip(request):
+        response = HttpResponse(html.data)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(str(html))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    if fragment_name is None:
+        patch_cache_control(response, private=True)
+    else:
+        patch_cache_control(response, public=True,
+                            max_age=NUMBER_OF_SECONDS)
+    return response
 
 
 def post_generator(post_limit, author, group):
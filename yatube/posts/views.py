@@ -1,38 +1,77 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.decorators.cache import cache_page
+from django.utils.http import is_safe_url
+from django.views.decorators.http import require_POST
 
+from core.cache import cached_fragment, get_cached_object_or_404
+from core.ratelimit import rate_limit
 from core.work_constants import LIMIT_POST_COEFFICIENT, NUMBER_OF_SECONDS
-from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
-from .utils import run_pag
+from .forms import PostForm, CommentForm, PublishAtForm
+from .counters import pending_views, record_view
+from .images import schedule_image_processing
+from .duplicates import index_post, update_post_index
+from .feeds import followed_feed
+from .models import Post, Group, Follow, GroupFollow, deleted_user_ids
+from .reactions import attach_reactions, toggle_reaction
+from .scheduler import schedule_post
+from .utils import (feed_engine, feed_fragment_response,
+                    get_active_author_or_404, paginate, prepare_page,
+                    render_post_list, run_pag)
 
 
-@cache_page(NUMBER_OF_SECONDS, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = run_pag(post_list, request, LIMIT_POST_COEFFICIENT)
+    # Номер страницы нормализуется до ключа кэша: без номера, page=1
+    # и мусор в адресе попадают в одну запись
+    page_obj = paginate(Post.objects.visible(), request,
+                        LIMIT_POST_COEFFICIENT, count_key='posts',
+                        estimate=True)
+
+    def render_posts():
+        return render_post_list(
+            'posts:index', 'posts/includes/post_list.html',
+            prepare_page(page_obj),
+        )
+
     context = {
         'page_obj': page_obj,
+        'posts_html': cached_fragment(
+            'index_page',
+            [page_obj.number],
+            NUMBER_OF_SECONDS,
+            render_posts,
+        ),
     }
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts_list_group = group.posts.all()
-    page_obj = run_pag(posts_list_group, request, LIMIT_POST_COEFFICIENT)
+    group = get_cached_object_or_404(Group, 'slug', slug)
+    posts_list_group = group.posts.visible()
+    page_obj = run_pag(posts_list_group, request, LIMIT_POST_COEFFICIENT,
+                       count_key=f'group:{group.pk}', user=request.user)
+    following = None
+    if request.user.is_authenticated:
+        following = GroupFollow.objects.filter(
+            user=request.user, group=group
+        ).exists()
     context = {
         'group': group,
         'page_obj': page_obj,
+        'following': following,
     }
+    if feed_engine('posts:group_list'):
+        context['posts_html'] = render_post_list(
+            'posts:group_list', 'posts/includes/group_post_list.html',
+            page_obj,
+        )
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    page_obj = run_pag(post_list, request, LIMIT_POST_COEFFICIENT)
+    author = get_active_author_or_404(username)
+    post_list = author.posts.visible()
+    page_obj = run_pag(post_list, request, LIMIT_POST_COEFFICIENT,
+                       count_key=f'author:{author.pk}', user=request.user)
     following = None
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -43,16 +82,25 @@ def profile(request, username):
         'page_obj': page_obj,
         'following': following,
     }
+    if feed_engine('posts:profile'):
+        context['posts_html'] = render_post_list(
+            'posts:profile', 'posts/includes/profile_post_list.html',
+            page_obj,
+        )
     return render(request, 'posts/profile.html', context)
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    posts_author = post.author.posts.all()
+    post = get_object_or_404(Post.objects.visible_to(request.user),
+                             id=post_id)
+    record_view(post.id)
+    attach_reactions([post], request.user)
+    posts_author = post.author.posts.visible()
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = post.comments.exclude(author_id__in=deleted_user_ids())
     context = {
         'post': post,
+        'views': post.views + pending_views(post.id),
         'posts_author': posts_author,
         'form': form,
         'comments': comments,
@@ -61,18 +109,25 @@ def post_detail(request, post_id):
 
 
 @login_required
+@rate_limit(methods=('POST',))
 def post_create(request):
     form = PostForm(
         request.POST or None,
         request.FILES or None,
     )
-    if form.is_valid():
+    schedule_form = PublishAtForm(request.POST or None)
+    if form.is_valid() and schedule_form.is_valid():
         obj_form = form.save(commit=False)
         obj_form.author = request.user
+        schedule_post(obj_form, schedule_form.cleaned_data['publish_at'])
         obj_form.save()
+        if form.signature is not None:
+            index_post(obj_form, form.signature)
+        schedule_image_processing(obj_form)
         return redirect("posts:profile", request.user)
     context = {
         'form': form,
+        'schedule_form': schedule_form,
         'is_edit': True
     }
     return render(request, 'posts/create_post.html', context)
@@ -80,7 +135,8 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.visible_to(request.user),
+                             id=post_id)
     if post.author != request.user:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
@@ -89,7 +145,11 @@ def post_edit(request, post_id):
         instance=post,
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'text' in form.changed_data:
+            update_post_index(post, form.signature)
+        if 'image' in form.changed_data:
+            schedule_image_processing(post)
         return redirect("posts:post_detail", post_id)
     context = {
         'form': form,
@@ -99,8 +159,9 @@ def post_edit(request, post_id):
 
 
 @login_required
+@rate_limit(methods=('POST',))
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.visible(), id=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -110,20 +171,37 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@login_required
+@require_POST
+@rate_limit()
+def post_reaction(request, post_id):
+    post = get_object_or_404(Post.objects.visible(), id=post_id)
+    toggle_reaction(request.user, post)
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(next_url, allowed_hosts={request.get_host()},
+                                require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.select_related('author').filter(
-        author__following__user=request.user)
-    page_obj = run_pag(post_list, request, LIMIT_POST_COEFFICIENT)
+    # Число постов ленты кэширует сама MergedFeed
+    page_obj = run_pag(followed_feed(request.user), request,
+                       LIMIT_POST_COEFFICIENT, user=request.user)
     context = {
         'page_obj': page_obj,
+        'posts_html': render_post_list(
+            'posts:follow_index', 'posts/includes/post_list.html', page_obj
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@rate_limit()
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_active_author_or_404(username)
     if request.user.username == author.username:
         return redirect('posts:profile', username=username)
     Follow.objects.get_or_create(user=request.user, author=author)
@@ -132,6 +210,44 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_active_author_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+@rate_limit()
+def group_follow(request, slug):
+    group = get_cached_object_or_404(Group, 'slug', slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug=slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    group = get_cached_object_or_404(Group, 'slug', slug)
+    GroupFollow.objects.filter(user=request.user, group=group).delete()
+    return redirect('posts:group_list', slug=slug)
+
+
+def index_fragment(request):
+    return feed_fragment_response(request, Post.objects.visible(),
+                                  'index_page')
+
+
+def group_fragment(request, slug):
+    group = get_cached_object_or_404(Group, 'slug', slug)
+    return feed_fragment_response(request, group.posts.visible(),
+                                  f'group_feed:{group.pk}',
+                                  show_group_link=False)
+
+
+def profile_fragment(request, username):
+    author = get_active_author_or_404(username)
+    return feed_fragment_response(request, author.posts.visible(),
+                                  f'author_feed:{author.pk}')
+
+
+@login_required
+def follow_fragment(request):
+    return feed_fragment_response(request, followed_feed(request.user))
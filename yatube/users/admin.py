@@ -0,0 +1,35 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.purge import soft_delete_users
+from .models import PendingDeletion
+
+User = get_user_model()
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class SoftDeleteUserAdmin(UserAdmin):
+    """
+    Удаление пользователя из админки скрывает его сразу,
+    а каскадное удаление контента идёт пачками в фоне.
+    """
+
+    def delete_model(self, request, obj):
+        soft_delete_users(User.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_users(queryset)
+
+
+@admin.register(PendingDeletion)
+class PendingDeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'requested_at',
+    )
+    search_fields = ('user__username',)
+    empty_value_display = '-пусто-'
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def user_cache():
+    return caches[settings.AUTH_USER_CACHE]
+
+
+def invalidate_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
+
+
+def invalidate_users(user_ids):
+    user_cache().delete_many([user_cache_key(user_id)
+                              for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берёт пользователя текущей сессии из общего
+    кэша процессов.
+    AuthenticationMiddleware вызывает get_user на каждый запрос; запись
+    сбрасывается сигналами при любом сохранении или удалении пользователя,
+    в том числе при смене пароля.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        cache = user_cache()
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
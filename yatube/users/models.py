@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class PendingDeletion(models.Model):
+    """Пользователь, скрытый с сайта и ожидающий фоновой очистки."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pending_deletion',
+        verbose_name='Пользователь',
+    )
+    requested_at = models.DateTimeField(
+        verbose_name='Дата запроса',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Удаление пользователя'
+        verbose_name_plural = 'Удаления пользователей'
+
+    def __str__(self):
+        return str(self.user)
@@ -0,0 +1,24 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends import cached_db
+
+# Бэкенды, путь которых остался в сессиях, созданных до перехода на кэш
+LEGACY_BACKENDS = {
+    'django.contrib.auth.backends.ModelBackend':
+        'users.backends.CachedModelBackend',
+}
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    Сессия cached_db, в которой путь прежнего бэкенда аутентификации
+    при загрузке заменяется на CachedModelBackend и сохраняется.
+    Старые сессии не разлогиниваются и тоже берут пользователя из кэша.
+    """
+
+    def load(self):
+        data = super().load()
+        backend = LEGACY_BACKENDS.get(data.get(BACKEND_SESSION_KEY))
+        if backend is not None:
+            data[BACKEND_SESSION_KEY] = backend
+            self.modified = True
+        return data
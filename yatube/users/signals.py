@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import register_object_cache
+from .backends import invalidate_user
+
+User = get_user_model()
+
+# Для страниц автора хватает имени; хэш пароля не кэшируется,
+# удалённые пользователи считаются отсутствующими
+register_object_cache(User, 'username',
+                      fields=('username', 'first_name', 'last_name'),
+                      filters={'pending_deletion': None})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
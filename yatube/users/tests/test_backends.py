@@ -0,0 +1,65 @@
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.backends import user_cache_key
+
+User = get_user_model()
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth',
+                                            password='12345678ndmM')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('posts:index')
+
+    def tearDown(self):
+        cache.clear()
+        caches['shared'].clear()
+
+    def test_session_and_user_are_cached(self):
+        """Сессия и пользователь берутся из общего кэша, а не из таблиц."""
+        self.authorized_client.get(self.url)
+        Session.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(self.url)
+        self.assertContains(response, f'Пользователь: {self.user.username}')
+        tables = (Session._meta.db_table, User._meta.db_table)
+        self.assertFalse([
+            query for query in queries
+            if any(f'"{table}"' in query['sql'] for table in tables)
+        ])
+
+    def test_password_change_invalidates_cache(self):
+        """После смены пароля старая сессия перестаёт действовать."""
+        self.authorized_client.get(self.url)
+        shared = caches['shared']
+        self.assertIsNotNone(shared.get(user_cache_key(self.user.pk)))
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('87654321ndmM')
+        user.save()
+        self.assertIsNone(shared.get(user_cache_key(self.user.pk)))
+        response = self.authorized_client.get(self.url)
+        self.assertNotContains(response, 'Пользователь:')
+
+    def test_sessions_of_model_backend_remain_valid(self):
+        """
+        Сессии, созданные с ModelBackend, не разлогиниваются
+        и переводятся на CachedModelBackend.
+        """
+        client = Client()
+        client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = client.get(self.url)
+        self.assertContains(response, f'Пользователь: {self.user.username}')
+        self.assertEqual(client.session[BACKEND_SESSION_KEY],
+                         'users.backends.CachedModelBackend')
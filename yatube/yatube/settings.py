@@ -4,7 +4,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 SECRET_KEY = '*1_jxg&xzn-_g2e4t2)07y+62)jbd1az2@gw#%4q)e1z_ej7+w'
 
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True').lower() in ('true', '1')
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -28,7 +28,6 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
@@ -39,18 +38,35 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# Приложения только для разработки: воркеры с DEBUG=False их не загружают
+DEV_APPS = ['debug_toolbar']
+DEV_MIDDLEWARE = ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
+if DEBUG:
+    INSTALLED_APPS += DEV_APPS
+    MIDDLEWARE += DEV_MIDDLEWARE
+
 ROOT_URLCONF = 'yatube.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # В продакшене шаблоны разбираются один раз на процесс
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-
-        'APP_DIRS': True,
+        'APP_DIRS': False,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -59,9 +75,26 @@ TEMPLATES = [
                 'core.context_processors.year.year',
             ]
         },
-    }
+    },
+    {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'core.jinja2.environment',
+        },
+    },
 ]
 
+# Альтернативный движок шаблонов для списков постов в лентах.
+# Ключ - имя view, например {'posts:index': 'jinja2'};
+# для не указанных view используются шаблоны Django.
+FEED_TEMPLATE_ENGINES = {}
+# Лента подписок сливается из выборок по авторам и группам, пока на
+# страницу нужно прочитать не больше FEED_MERGE_MAX_ROWS строк из всех
+# выборок; дальние страницы и большие подписки читаются одним запросом
+FEED_MERGE_MAX_ROWS = 300
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -117,15 +150,187 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Сессии читаются из общего кэша и пишутся сквозь него в базу,
+# пользователь сессии тоже берётся из общего кэша: выход и смена пароля
+# сразу действуют во всех процессах. users.sessions переводит сессии,
+# созданные с ModelBackend, на CachedModelBackend
+SESSION_ENGINE = 'users.sessions'
+SESSION_CACHE_ALIAS = 'shared'
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+AUTH_USER_CACHE = 'shared'
+AUTH_USER_CACHE_TIMEOUT = 60 * 15
+
+# Закэшированные фрагменты отдаются устаревшими ещё CACHE_STALE_TIMEOUT
+# секунд, пока один воркер их пересчитывает под блокировкой в общем кэше
+# CACHE_LOCK_CACHE; CACHE_EARLY_EXPIRY_BETA > 1 заставляет пересчитывать
+# раньше срока
+CACHE_STALE_TIMEOUT = 60
+CACHE_LOCK_CACHE = 'shared'
+CACHE_LOCK_TIMEOUT = 10
+CACHE_EARLY_EXPIRY_BETA = 1.0
+# Версии фрагментов и потоков лент и числа постов пагинатора хранятся
+# в общем кэше: сброс из любого процесса, в том числе из планировщика
+# публикаций, сразу виден всем воркерам
+INVALIDATION_CACHE = 'shared'
+# Строки длиннее CACHE_COMPRESS_MIN_SIZE символов хранятся в кэше
+# сжатыми gzip и так же отдаются клиентам
+CACHE_COMPRESS_MIN_SIZE = 1024
+CACHE_COMPRESS_LEVEL = 6
+# Статистика сжатия собирается процессами и раз в интервал
+# складывается в общий кэш, откуда её читает cache_compression_stats
+CACHE_COMPRESSION_STATS_CACHE = 'shared'
+CACHE_COMPRESSION_STATS_INTERVAL = 60
+
+# Кэш групп и авторов по адресу страницы; отсутствие объекта
+# кэшируется на меньший срок в отдельном кэше ограниченного размера,
+# чтобы запросы к случайным адресам не вытесняли существующие объекты
+OBJECT_CACHE_TIMEOUT = 60 * 15
+OBJECT_CACHE_MISS_TIMEOUT = 60
+OBJECT_CACHE_MISS_CACHE = 'object_misses'
+
+# Число постов в лентах для пагинатора: сколько секунд можно отдавать
+# устаревшее значение, с какого размера выборки его кэшировать и с какого
+# размера таблицы брать оценку из статистики базы вместо COUNT(*).
+# Оценка для выборки с условиями умножается на долю подходящих строк,
+# которая пересчитывается раз в PAGINATOR_RATIO_TIMEOUT секунд
+PAGINATOR_COUNT_TIMEOUT = 60
+PAGINATOR_CACHE_MIN_COUNT = 1000
+PAGINATOR_ESTIMATE_MIN_ROWS = 100_000
+PAGINATOR_RATIO_TIMEOUT = 60 * 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Хэш загружаемого файла считается по мере получения запроса
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploadhandler.HashingMemoryFileUploadHandler',
+    'posts.uploadhandler.HashingTemporaryFileUploadHandler',
+]
+
+# default - кэш процесса для фрагментов страниц; shared - общий для всех
+# процессов кэш в базе для данных, которые должны быть согласованы
+# между воркерами. Таблицу shared создаёт миграция core (createcachetable).
+# object_misses - небольшой кэш процесса для отсутствующих групп и авторов
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+    'object_misses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'object_misses',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
 }
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Шаблоны приложений подключаются через app_directories в TEMPLATE_LOADERS
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
+# Фоновые задачи: в разработке и тестах выполняются сразу в запросе
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+BACKGROUND_TASKS_EAGER = os.getenv(
+    'BACKGROUND_TASKS_EAGER', str(DEBUG)
+).lower() in ('true', '1')
+
+# Обработка картинок постов при загрузке
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_QUALITY = 85
+POST_IMAGE_VARIANT_FORMATS = ('WEBP', 'AVIF')
+
+# Ширины миниатюр для srcset и форматы для <picture>
+RESPONSIVE_IMAGE_WIDTHS = (320, 640, 960)
+RESPONSIVE_IMAGE_FORMATS = ('WEBP',)
+# Геометрии тега responsive_image в шаблонах постов: их миниатюры
+# строятся фоновой обработкой картинки при загрузке
+POST_IMAGE_RENDITIONS = (
+    ('960x480', {'crop': 'center', 'upscale': True}),
+)
+
+# Варианты оригиналов, которые медиа-view отдаёт по заголовку Accept,
+# в порядке предпочтения
+MEDIA_NEGOTIATED_FORMATS = (
+    ('image/avif', 'avif'),
+    ('image/webp', 'webp'),
+)
+
+# Доставка медиа фронт-сервером после проверки доступа в Django:
+# 'nginx' - X-Accel-Redirect на MEDIA_ACCEL_PREFIX (internal location),
+# 'sendfile' - X-Sendfile (Apache mod_xsendfile, lighttpd),
+# пустая строка - отдача файла самим Django
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Очистка мягко удалённых пользователей и постов командой purge_deleted
+PURGE_BATCH_SIZE = 100
+PURGE_BATCH_PAUSE = 0.5
+
+# Как часто процесс записывает накопленные просмотры постов в базу
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+
+# Планировщик публикаций держит в очереди столько ближайших постов
+# и перечитывает её из базы не реже раза в SCHEDULER_MAX_SLEEP секунд
+SCHEDULER_BATCH_SIZE = 100
+SCHEDULER_MAX_SLEEP = 60
+
+# Поиск почти одинаковых постов: минимальная длина проверяемого текста
+# и порог оценки сходства Жаккара по MinHash-подписям
+DUPLICATE_MIN_LENGTH = 50
+DUPLICATE_THRESHOLD = 0.8
+
+# Картинки считаются копиями, если pHash и ещё один перцептивный хэш
+# (aHash или dHash) отличаются не больше чем на столько бит из 64
+IMAGE_HASH_MAX_DISTANCE = 8
+# Как часто (в секундах) процесс сверяет своё дерево запрещённых картинок
+# с базой
+IMAGE_BLOCKLIST_CHECK_INTERVAL = 10
+
+# Счётчик реакций поста разбит на части, сумма частей держится в кэше
+REACTION_COUNTER_SHARDS = 8
+REACTION_COUNT_TIMEOUT = 5 * 60
+
+# gc_media не трогает файлы моложе суток: их пост может ещё сохраняться
+GC_MEDIA_MIN_AGE = 24 * 60 * 60
+
+# Ограничение частоты записи: имя URL -> (запросов, за сколько секунд).
+# Корзинам нужен кэш с атомарным incr: memcached по адресу
+# RATE_LIMIT_MEMCACHED общий для всех процессов, без него корзины
+# хранятся в памяти и лимит действует в каждом процессе отдельно
+RATE_LIMITS = {
+    'posts:post_create': (5, 60),
+    'posts:add_comment': (10, 60),
+    'posts:profile_follow': (30, 60),
+    'posts:group_follow': (30, 60),
+    'posts:post_reaction': (60, 60),
+}
+RATE_LIMIT_CACHE = 'ratelimit'
+if os.getenv('RATE_LIMIT_MEMCACHED'):
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.getenv('RATE_LIMIT_MEMCACHED'),
+    }
+else:
+    CACHES['ratelimit'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ratelimit',
+    }
+# Брать IP клиента из X-Forwarded-For (только за доверенным прокси)
+RATE_LIMIT_TRUST_FORWARDED = (
+    os.getenv('RATE_LIMIT_TRUST_FORWARDED', 'False').lower()
+    in ('true', '1')
+)
+
+# Метаданные миниатюр sorl-thumbnail хранятся в таблице thumbnail_kvstore,
+# перед ней LRU процесса. THUMBNAIL_CACHE - имя общего кэша (memcached,
+# Redis) между LRU и таблицей; None - читать таблицу напрямую
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.KVStore'
+THUMBNAIL_CACHE = None
+THUMBNAIL_LRU_SIZE = 2048
+THUMBNAIL_LRU_TIMEOUT = 60